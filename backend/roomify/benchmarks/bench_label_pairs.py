@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Пропускная способность раскладки пар «лейбл : значение».
+
+Сравниваем прежнюю цепочку `"подстрока" in label` (скопирована ниже как есть)
+с предкомпилированной таблицей из listings/services/labels.py.
+
+Запуск (из backend/roomify):
+    python benchmarks/bench_label_pairs.py [--pairs 500] [--pages 200]
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from listings.services import labels  # noqa: E402
+from listings.services.scraper import Listing, apply_label_pairs  # noqa: E402
+
+LABELS = [
+    "Общая площадь", "Площадь, м²", "Жилая площадь", "Площадь кухни",
+    "Количество комнат", "Этаж", "Этаж из", "Этажность дома", "Всего этажей",
+    "Год постройки", "Адрес", "Цена", "Тип дома", "Состояние", "Санузел",
+    "Балкон", "Парковка", "Мебель", "Потолки", "Безопасность", "Интернет",
+    "Жилой комплекс", "Город", "Район", "Бывшее общежитие", "Телефон",
+]
+VALUES = ["65 м²", "2", "5 из 9", "2008", "ул. Абая 10", "35 000 000 〒",
+          "хорошее", "раздельный", "есть", "2.7 м", "оптика"]
+
+
+# --- прежняя реализация (до labels.py) ---
+
+def _legacy_to_float(s):
+    if not s:
+        return None
+    m = re.search(r"(\d+[.,]?\d*)", str(s).replace("\u00A0", " ").replace(" ", ""))
+    if not m:
+        return None
+    try:
+        return float(m.group(1).replace(",", "."))
+    except ValueError:
+        return None
+
+
+def _legacy_clean(s):
+    return re.sub(r"\s+", " ", s or "").strip()
+
+
+def _legacy_first(*vals):
+    for v in vals:
+        if v is not None and v != "":
+            return v
+    return None
+
+
+def legacy_apply(pairs, listing):
+    for k, v in pairs:
+        lk = _legacy_clean(k).lower()
+        v = _legacy_clean(v)
+        if not listing.rooms and ("комнат" in lk or "rooms" in lk):
+            listing.rooms = v
+        if ("общая площадь" in lk or "площадь" in lk or "area" in lk) and not listing.total_area_m2:
+            listing.total_area_m2 = _legacy_to_float(v)
+        if ("жилая площадь" in lk or "living area" in lk) and not listing.living_area_m2:
+            listing.living_area_m2 = _legacy_to_float(v)
+        if ("площадь кухни" in lk or "kitchen area" in lk) and not listing.kitchen_area_m2:
+            listing.kitchen_area_m2 = _legacy_to_float(v)
+        if ("этаж" in lk) and ("этажност" not in lk):
+            listing.floor = _legacy_first(listing.floor, v)
+        if ("этажност" in lk or "всего этажей" in lk or "floors" in lk):
+            listing.floors_total = _legacy_first(listing.floors_total, v)
+        if ("год постройки" in lk or "year built" in lk) and not listing.year_built:
+            listing.year_built = v
+        if ("адрес" in lk or "address" in lk) and not listing.address:
+            listing.address = v
+        if ("цена" in lk or "price" in lk) and not listing.price:
+            listing.price = v
+
+
+def make_pages(n_pages, n_pairs, seed=42):
+    rnd = random.Random(seed)
+    return [
+        [(rnd.choice(LABELS) + rnd.choice(["", ":", " "]), rnd.choice(VALUES))
+         for _ in range(n_pairs)]
+        for _ in range(n_pages)
+    ]
+
+
+def run(fn, pages):
+    t0 = time.perf_counter()
+    for pairs in pages:
+        fn(pairs, Listing(url="https://krisha.kz/a/show/1"))
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pairs", type=int, default=500, help="пар на страницу")
+    ap.add_argument("--pages", type=int, default=200)
+    args = ap.parse_args()
+
+    pages = make_pages(args.pages, args.pairs)
+    total = args.pages * args.pairs
+
+    # результаты должны совпадать
+    for pairs in pages[:20]:
+        a, b = Listing(url="x"), Listing(url="x")
+        legacy_apply(pairs, a)
+        apply_label_pairs(pairs, b)
+        assert a == b, (a, b)
+
+    labels.classify_label.cache_clear()
+    for name, fn in (("legacy in-chain", legacy_apply), ("compiled table", apply_label_pairs)):
+        dt = run(fn, pages)
+        print(f"{name:16s} {total / dt:12,.0f} pairs/s  ({dt * 1000:.1f} ms, "
+              f"{args.pages} pages x {args.pairs} pairs)")
+    print("label cache:", labels.classify_label.cache_info())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Сериализация списка Listing: DRF ListingSerializer + JSONRenderer против
+быстрого пути listings.serializers (.values_list() + orjson).
+
+Строки — синтетические объявления во временной тестовой БД (dev-базу
+бенчмарк не трогает). Перед замером проверяем, что на полном наборе
+полей оба пути дают одинаковый JSON.
+
+Запуск (из backend/roomify):
+    python benchmarks/bench_listing_serializer.py [--sizes 1000,10000] [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "roomify.settings")
+os.environ.setdefault("SECRET_KEY", "bench")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from listings.models import Listing  # noqa: E402
+from listings.serializers import (  # noqa: E402
+    DEFAULT_READ_FIELDS, READ_FIELDS, ListingSerializer, dumps, listing_rows, orjson,
+)
+
+SPARSE = frozenset({"id", "title", "price", "currency", "rooms", "total_area_m2"})
+
+
+def make_listings(n: int) -> None:
+    rnd = random.Random(n)
+    objs = []
+    for i in range(n):
+        rooms = rnd.randint(1, 5)
+        area = round(rnd.uniform(25, 180), 1)
+        photos = [f"https://krisha-photos.kcdn.online/webp/ab/{i}/{k}-750x470.webp"
+                  for k in range(rnd.randint(3, 15))]
+        data = {
+            "title": f"{rooms}-комнатная квартира, {area} м²",
+            "price": str(rnd.randint(15, 150) * 1_000_000), "currency": "KZT",
+            "address": f"Алматы, ул. Абая {rnd.randint(1, 200)}",
+            "latitude": 43.2 + rnd.random() / 10, "longitude": 76.9 + rnd.random() / 10,
+            "rooms": str(rooms), "total_area_m2": area, "floor": str(rnd.randint(1, 9)),
+            "floors_total": "9", "year_built": str(rnd.randint(1960, 2024)),
+            "description": "Продаётся квартира. " * rnd.randint(10, 60),
+            "images": photos,
+        }
+        objs.append(Listing(source_url=f"https://krisha.kz/a/show/{1000000 + i}",
+                            raw=data, fetch_count=1, **data))
+    Listing.objects.bulk_create(objs, batch_size=1000)
+
+
+def drf(qs) -> bytes:
+    return JSONRenderer().render(ListingSerializer(qs, many=True).data)
+
+
+def fast(qs, fields) -> bytes:
+    return dumps(listing_rows(qs, fields))
+
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000,10000")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    sizes = [int(x) for x in args.sizes.split(",")]
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        make_listings(max(sizes))
+        print(f"encoder: {'orjson ' + orjson.__version__ if orjson else 'stdlib json'}")
+        print(f"{'rows':>6s} {'variant':24s} {'ms':>9s} {'rows/s':>10s} {'x DRF':>7s} {'KiB':>8s}")
+        for n in sizes:
+            qs = Listing.objects.order_by("id")[:n]
+            assert json.loads(drf(qs)) == json.loads(fast(qs, READ_FIELDS)), "outputs differ"
+
+            base = best_of(lambda: drf(qs), args.repeat)
+            variants = [
+                ("DRF serializer", base, len(drf(qs))),
+                ("fast, all fields", best_of(lambda: fast(qs, READ_FIELDS), args.repeat),
+                 len(fast(qs, READ_FIELDS))),
+                ("fast, default (no raw)", best_of(lambda: fast(qs, DEFAULT_READ_FIELDS), args.repeat),
+                 len(fast(qs, DEFAULT_READ_FIELDS))),
+                ("fast, ?fields= 6 fields", best_of(lambda: fast(qs, SPARSE), args.repeat),
+                 len(fast(qs, SPARSE))),
+            ]
+            for name, sec, size in variants:
+                print(f"{n:6d} {name:24s} {sec * 1000:9.1f} {n / sec:10.0f} "
+                      f"{base / sec:7.1f} {size / 1024:8.0f}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
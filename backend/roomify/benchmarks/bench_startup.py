@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Стоимость старта процесса Django: время до загруженного URLconf, пиковый
+RSS и разбор `python -X importtime` (что именно импортируется и сколько стоит).
+
+Режимы (каждый — отдельный свежий интерпретатор):
+    read-only  SCRAPER_ENABLED=0: воркер только для чтения, скрейпер не подключается вовсе
+    lazy       обычный воркер: скрейпер импортируется при первом запросе к нему
+    eager      lazy + явный импорт scraper/krisha_scraper — столько же стоил
+               старт, пока views импортировали их на верхнем уровне (и столько
+               же весит lazy-воркер после первого запроса к скрейперу)
+
+На старте read-only и lazy одинаковы; разница в том, что read-only не
+загрузит стек скрейпера и под нагрузкой.
+
+Запуск (из backend/roomify):
+    python benchmarks/bench_startup.py [--runs 7] [--top 12]
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CHILD = r"""
+import json, resource, sys, time
+STACK = {stack!r}
+t0 = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns  # URLconf -> listings.views
+if {eager}:
+    import listings.services.scraper, listings.services.krisha_scraper
+ms = (time.perf_counter() - t0) * 1000
+print(json.dumps({{
+    "ms": ms,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+    "scraper_stack": [m for m in STACK if m in sys.modules],
+}}))
+"""
+
+# requests сюда не входит: его импортирует rest_framework.compat (RequestsClient),
+# если пакет установлен, — с любым DRF-view, не только со скрейпером
+STACK = ("bs4", "lxml", "listings.services.scraper", "listings.services.krisha_scraper")
+
+MODES = {
+    "read-only": ({"SCRAPER_ENABLED": "0"}, False),
+    "lazy": ({"SCRAPER_ENABLED": "1"}, False),
+    "eager": ({"SCRAPER_ENABLED": "1"}, True),
+}
+
+# import time: self [us] | cumulative | imported package
+_IMPORTTIME_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def run_child(mode: str, importtime: bool = False):
+    extra_env, eager = MODES[mode]
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": "roomify.settings", **extra_env}
+    env.setdefault("SECRET_KEY", "bench")
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + \
+          ["-c", CHILD.format(eager=eager, stack=STACK)]
+    proc = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1]), proc.stderr
+
+
+def top_level_imports(stderr: str):
+    """(модуль, cumulative мс) для импортов верхнего уровня, по убыванию."""
+    out = []
+    for line in stderr.splitlines():
+        m = _IMPORTTIME_RE.match(line)
+        if m and len(m.group(3)) == 1:  # отступ в один пробел — прямой импорт
+            out.append((m.group(4), int(m.group(2)) / 1000))
+    return sorted(out, key=lambda x: -x[1])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=11)
+    ap.add_argument("--top", type=int, default=12, help="сколько импортов показать по режиму")
+    args = ap.parse_args()
+
+    print(f"{'mode':10s} {'startup ms':>11s} {'RSS MB':>8s} {'modules':>8s}  scraper stack loaded")
+    for mode in MODES:
+        runs = [run_child(mode)[0] for _ in range(args.runs)]
+        r = runs[-1]
+        # время — лучший из прогонов (шум планировщика только добавляет), RSS — медиана
+        best = min(x["ms"] for x in runs)
+        print(f"{mode:10s} {best:11.1f} {statistics.median(x['rss_mb'] for x in runs):8.1f} "
+              f"{r['modules']:8d}  {', '.join(r['scraper_stack']) or '-'}")
+
+    for mode in MODES:
+        _, stderr = run_child(mode, importtime=True)
+        print(f"\n-X importtime, {mode}: top-level imports by cumulative time")
+        for name, ms in top_level_imports(stderr)[:args.top]:
+            print(f"  {ms:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Байты «на проводе» на один запрос к API: без сжатия, gzip, brotli и
+повторный запрос с If-None-Match (304).
+
+Всё in-process через django.test.Client: krisha.kz подменяется
+синтетическими страницами из services/replay.py, БД — временная тестовая
+(dev-базу бенчмарк не трогает). Считаются тело + заголовки ответа.
+
+Запуск (из backend/roomify):
+    python benchmarks/bench_wire_bytes.py [--ads 20]
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "roomify.settings")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ["KRISHA_HTTP_MODE"] = "replay"
+os.environ["KRISHA_REPLAY_SYNTHETIC"] = "1"
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+ENCODINGS = (("identity", ""), ("gzip", "gzip"), ("br", "br, gzip"))
+FIRST_AD = 1000000
+
+
+def wire_size(resp) -> int:
+    head = sum(len(k) + len(v) + 4 for k, v in resp.items())  # "k: v\r\n"
+    return head + len(resp.content)
+
+
+def measure(client, method, path, body=None):
+    """{кодировка: байт} + байт ответа 304 на повторный GET с ETag."""
+    out = {}
+    etag = None
+    for name, accept in ENCODINGS:
+        kw = {"HTTP_ACCEPT_ENCODING": accept} if accept else {}
+        if method == "POST":
+            resp = client.post(path, body, content_type="application/json", **kw)
+        else:
+            resp = client.get(path, **kw)
+        assert resp.status_code < 400, (path, resp.status_code)
+        # короткие ответы middleware не сжимает — тогда Content-Encoding нет
+        assert resp.get("Content-Encoding") in (None, name), (name, resp.get("Content-Encoding"))
+        out[name] = wire_size(resp)
+        if name == "gzip":
+            etag = resp.get("ETag")
+    if etag and method == "GET":
+        resp = client.get(path, HTTP_ACCEPT_ENCODING="br, gzip", HTTP_IF_NONE_MATCH=etag)
+        assert resp.status_code == 304, (path, resp.status_code)
+        out["304"] = wire_size(resp)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--ads", type=int, default=20, help="сколько объявлений усреднить")
+    args = ap.parse_args()
+
+    setup_test_environment()
+    settings.ALLOWED_HOSTS = ["testserver"]
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        client = Client()
+        # /api/ingest — только для staff
+        client.force_login(User.objects.create_superuser("bench", password="bench"))
+        totals = {}
+        for ad_id in range(FIRST_AD, FIRST_AD + args.ads):
+            url = f"https://krisha.kz/a/show/{ad_id}"
+            rows = {
+                "POST /api/ingest": measure(client, "POST", "/api/ingest", {"url": url}),
+                "GET /api/krisha/<id>": measure(client, "GET", f"/api/krisha/{ad_id}"),
+                "GET /api/krisha/<id>?fields=title": measure(
+                    client, "GET", f"/api/krisha/{ad_id}?fields=title"),
+            }
+            for endpoint, sizes in rows.items():
+                acc = totals.setdefault(endpoint, {})
+                for k, v in sizes.items():
+                    acc[k] = acc.get(k, 0) + v
+
+        cols = ["identity", "gzip", "br", "304"]
+        print(f"{'endpoint':36s}" + "".join(f"{c:>10s}" for c in cols) + "   (bytes/request)")
+        for endpoint, acc in totals.items():
+            cells = [f"{acc[c] / args.ads:10.0f}" if c in acc else f"{'-':>10s}" for c in cols]
+            print(f"{endpoint:36s}" + "".join(cells))
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Генератор нагрузки на Django API с фиксированным RPS (open-loop).
+
+Запросы стартуют по расписанию независимо от того, ответили ли предыдущие,
+а задержка считается от запланированного момента — иначе медленный сервер
+сам себе «снижает» нагрузку и перцентили выходят слишком оптимистичными.
+
+Офлайн-прогон без krisha.kz:
+    KRISHA_HTTP_MODE=replay KRISHA_REPLAY_SYNTHETIC=1 KRISHA_REPLAY_LATENCY_MS=80 \\
+        python manage.py runserver --noreload 8000
+    python benchmarks/loadgen.py --rps 20 --duration 30 \\
+        --path '/api/krisha/{id}' --ids 1000000-1000500
+
+Только стандартная библиотека, чтобы не тянуть зависимости на машину с нагрузкой.
+"""
+
+import argparse
+import collections
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def parse_ids(spec):
+    if "-" in spec:
+        lo, hi = spec.split("-", 1)
+        return list(range(int(lo), int(hi) + 1))
+    return [int(x) for x in spec.split(",") if x]
+
+
+def percentile(sorted_vals, p):
+    if not sorted_vals:
+        return float("nan")
+    k = (len(sorted_vals) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.statuses = collections.Counter()
+        self.bytes = 0
+
+    def add(self, latency, status, size):
+        with self.lock:
+            self.latencies.append(latency)
+            self.statuses[status] += 1
+            self.bytes += size
+
+
+def fire(url, scheduled, stats, timeout, method="GET", body=None):
+    req = urllib.request.Request(url, data=body, method=method,
+                                 headers={"Accept": "application/json",
+                                          "Content-Type": "application/json"})
+    status, size = 0, 0
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            size = len(resp.read())
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        size = len(e.read() or b"")
+        status = e.code
+    except Exception:
+        status = "error"
+    stats.add(time.perf_counter() - scheduled, status, size)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--base", default="http://127.0.0.1:8000")
+    ap.add_argument("--path", default="/api/krisha/{id}",
+                    help="шаблон пути, {id} подставляется из --ids")
+    ap.add_argument("--ids", default="1000000-1000100", help="'a-b' или 'a,b,c'")
+    ap.add_argument("--method", default="GET", choices=("GET", "POST"))
+    ap.add_argument("--body", default=None,
+                    help="тело для POST, например '{\"url\": \"https://krisha.kz/a/show/{id}\"}'")
+    ap.add_argument("--rps", type=float, default=10.0)
+    ap.add_argument("--duration", type=float, default=30.0, help="секунд")
+    ap.add_argument("--workers", type=int, default=64)
+    ap.add_argument("--timeout", type=float, default=30.0)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--json", action="store_true", help="вывести итог в JSON")
+    args = ap.parse_args()
+
+    ids = parse_ids(args.ids)
+    rnd = random.Random(args.seed)
+    stats = Stats()
+    total = int(args.rps * args.duration)
+    interval = 1.0 / args.rps
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for i in range(total):
+            scheduled = start + i * interval
+            now = time.perf_counter()
+            if scheduled > now:
+                time.sleep(scheduled - now)
+            ad_id = rnd.choice(ids)
+            url = args.base + args.path.format(id=ad_id)
+            body = args.body.replace("{id}", str(ad_id)).encode() if args.body else None
+            pool.submit(fire, url, scheduled, stats, args.timeout, args.method, body)
+    elapsed = time.perf_counter() - start
+
+    lat = sorted(stats.latencies)
+    ok = sum(n for s, n in stats.statuses.items() if isinstance(s, int) and s < 400)
+    report = {
+        "requests": len(lat),
+        "target_rps": args.rps,
+        "achieved_rps": round(len(lat) / elapsed, 2),
+        "ok_rps": round(ok / elapsed, 2),
+        "p50_ms": round(percentile(lat, 50) * 1000, 1),
+        "p95_ms": round(percentile(lat, 95) * 1000, 1),
+        "p99_ms": round(percentile(lat, 99) * 1000, 1),
+        "max_ms": round(lat[-1] * 1000, 1) if lat else None,
+        "bytes_per_request": round(stats.bytes / max(1, len(lat))),
+        "statuses": {str(k): v for k, v in sorted(stats.statuses.items(), key=str)},
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for k, v in report.items():
+        print(f"{k:18s} {v}")
+
+
+if __name__ == "__main__":
+    main()
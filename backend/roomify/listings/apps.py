@@ -1,6 +1,27 @@
+import os
+
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.models.signals import post_migrate
 
 
 class ListingsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'listings'
+
+    def ready(self):
+        from .services.search import ensure_sqlite_triggers
+
+        # SQLite теряет FTS-триггеры, когда миграция пересоздаёт listings_listing
+        post_migrate.connect(ensure_sqlite_triggers, sender=self,
+                             dispatch_uid="listings.ensure_sqlite_triggers")
+
+        # воркер без скрейпера наружу не ходит; воспроизведённый трафик
+        # (KRISHA_HTTP_MODE=replay) до krisha.kz не доходит — бюджет не тратит
+        if not settings.SCRAPER_ENABLED or os.environ.get("KRISHA_HTTP_MODE") == "replay":
+            return
+        from .services import http_client
+        from .services.recrawl import record_fetch
+
+        if record_fetch not in http_client.fetch_hooks:
+            http_client.fetch_hooks.append(record_fetch)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from listings.services.dedup import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Recompute MinHash signatures, the LSH index and duplicate clusters for all listings"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **opts):
+        indexed, dups = rebuild_index(opts['batch_size'])
+        self.stdout.write(f"{indexed} listings indexed, {dups} marked as duplicates")
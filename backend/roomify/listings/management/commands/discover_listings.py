@@ -0,0 +1,52 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from listings.services.discovery import (
+    DEFAULT_SEARCH_URL, KnownIds, discover, iter_search_pages, iter_sitemap, sitemap_roots,
+)
+
+
+class Command(BaseCommand):
+    help = "Find ad ids on krisha.kz sitemaps/search pages that are not stored yet"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', choices=('sitemap', 'search', 'both'), default='search')
+        parser.add_argument('--search-url', default=DEFAULT_SEARCH_URL)
+        parser.add_argument('--max-pages', type=int, default=10,
+                            help="search result pages to read")
+        parser.add_argument('--limit', type=int, default=None,
+                            help="stop after N new ids")
+        parser.add_argument('--ingest', action='store_true',
+                            help="scrape and store every new listing")
+
+    def handle(self, *args, **opts):
+        sources = []
+        if opts['source'] in ('search', 'both'):
+            sources.append(iter_search_pages(opts['search_url'], opts['max_pages']))
+        if opts['source'] in ('sitemap', 'both'):
+            sources.extend(iter_sitemap(u) for u in sitemap_roots())
+
+        known = KnownIds.from_db()
+        self.stderr.write(f"{len(known)} listings already stored")
+        new_ids = islice(discover(sources, known), opts['limit'])
+
+        if not opts['ingest']:
+            for ad_id in new_ids:
+                self.stdout.write(str(ad_id))
+            return
+
+        from listings.services.ingest import upsert_listing
+        from listings.services.krisha_scraper import build_krisha_url
+        from listings.services.scraper import scrape_listing
+
+        ok = failed = 0
+        for ad_id in new_ids:
+            url = build_krisha_url(ad_id)
+            try:
+                upsert_listing(url, scrape_listing(url))
+                ok += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"{url}: {e}")
+        self.stdout.write(f"ingested={ok} failed={failed}")
@@ -1,5 +1,4 @@
 from django.core.management.base import BaseCommand
-from listings.services.scraper import scrape_listing
 from pprint import pprint
 
 class Command(BaseCommand):
@@ -9,5 +8,8 @@ class Command(BaseCommand):
         parser.add_argument('url')
 
     def handle(self, *args, **opts):
+        # скрейпер (requests, bs4, lxml) грузим только когда команда реально запущена
+        from listings.services.scraper import scrape_listing
+
         data = scrape_listing(opts['url'])
         pprint(data)
\ No newline at end of file
@@ -0,0 +1,45 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from listings.services.recrawl import (
+    REQUESTS_PER_LISTING, RequestBudget, default_budget, recrawl_once,
+)
+
+
+class Command(BaseCommand):
+    help = "Refetch the stored listings most likely to be stale, within an hourly request budget"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget', type=int, default=None,
+                            help="requests per hour (default: settings.RECRAWL_BUDGET_PER_HOUR)")
+        parser.add_argument('--min-age', type=float, default=1.0,
+                            help="skip listings checked less than N hours ago")
+        parser.add_argument('--loop', action='store_true',
+                            help="keep running, spending the budget as it frees up")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="only print what would be refetched")
+
+    def handle(self, *args, **opts):
+        budget = RequestBudget(opts['budget']) if opts['budget'] is not None else default_budget()
+        if budget.per_hour < REQUESTS_PER_LISTING:
+            raise CommandError(f"budget must be at least {REQUESTS_PER_LISTING} requests per hour")
+        min_age = timedelta(hours=opts['min_age'])
+
+        while True:
+            stats = recrawl_once(budget, min_age=min_age, dry_run=opts['dry_run'])
+            self.stdout.write(
+                f"picked={stats['picked']} changed={stats['changed']} "
+                f"unchanged={stats['unchanged']} failed={stats['failed']} "
+                f"budget_left={budget.available()}/{budget.per_hour}"
+            )
+            if not opts['loop'] or opts['dry_run']:
+                break
+            wait = budget.seconds_until_available(REQUESTS_PER_LISTING)
+            if wait:
+                # бюджет исчерпан — ждём, пока освободится хотя бы одно объявление
+                time.sleep(min(wait, 60.0))
+            elif stats['picked'] == 0:
+                # нечего обновлять — раз в минуту проверяем, не «созрели» ли новые
+                time.sleep(60.0)
@@ -0,0 +1,26 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from listings.services.history import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute daily median price per room count and currency (PriceRollup) from ListingSnapshot"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="first day, YYYY-MM-DD (default: yesterday)")
+        parser.add_argument('--until', help="last day, YYYY-MM-DD (default: today)")
+
+    def handle(self, *args, **opts):
+        today = timezone.localdate()
+        try:
+            since = date.fromisoformat(opts['since']) if opts['since'] else today - timedelta(days=1)
+            until = date.fromisoformat(opts['until']) if opts['until'] else today
+        except ValueError as e:
+            raise CommandError(str(e))
+        if since > until:
+            raise CommandError("--since must not be after --until")
+        n = rebuild_rollups(since, until)
+        self.stdout.write(f"{n} rollup rows for {since}..{until}")
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:00
+
+import django.db.models.deletion
+import django.utils.timezone
+import re
+from django.db import migrations, models
+
+
+def seed_snapshots(apps, schema_editor):
+    """Начальная точка истории для уже сохранённых объявлений."""
+    Listing = apps.get_model('listings', 'Listing')
+    ListingSnapshot = apps.get_model('listings', 'ListingSnapshot')
+    price_re = re.compile(r"\d+(?:[.,]\d+)?")
+    batch = []
+    for pk, price, ts in Listing.objects.values_list('id', 'price', 'updated_at').iterator():
+        m = price_re.search((price or "").replace("\u00A0", "").replace(" ", ""))
+        batch.append(ListingSnapshot(
+            listing_id=pk, ts=ts,
+            price_value=int(float(m.group(0).replace(",", "."))) if m else None,
+            changes={'price': price} if price else {},
+        ))
+        if len(batch) >= 1000:
+            ListingSnapshot.objects.bulk_create(batch)
+            batch = []
+    ListingSnapshot.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0002_listing_recrawl_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ts', models.DateTimeField(default=django.utils.timezone.now)),
+                ('price_value', models.BigIntegerField(blank=True, null=True)),
+                ('changes', models.JSONField(blank=True, default=dict)),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='listings.listing')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['listing', 'ts'], name='snapshot_listing_ts')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PriceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('rooms', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('listings', models.PositiveIntegerField()),
+                ('median_price', models.BigIntegerField()),
+            ],
+            options={
+                'ordering': ['day', 'rooms'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'rooms'), name='rollup_day_rooms')],
+            },
+        ),
+        migrations.RunPython(seed_snapshots, migrations.RunPython.noop),
+    ]
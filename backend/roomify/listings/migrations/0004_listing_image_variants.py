@@ -0,0 +1,107 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:00
+
+import hashlib
+import json
+import re
+from urllib.parse import urlparse
+
+from django.db import migrations, models
+
+# Замороженная копия services/images.py и ingest.content_hash на момент
+# миграции: живой код приложения меняется, а миграция должна давать тот же
+# результат, когда бы её ни применили.
+IMAGE_HOST = "krisha-photos.kcdn.online"
+MAX_PHOTOS = 30
+DEVICE_WIDTHS = {"mobile": 400, "desktop": 1200}
+FULL_WIDTH = 10 ** 6
+_PATH_RE = re.compile(
+    r"^/(?P<root>webp|photos|images|img)/(?P<key>.+?)"
+    r"(?:-(?P<w>\d+)x(?P<h>\d+)|-(?P<full>full))?"
+    r"\.(?P<ext>jpe?g|png|webp|gif)$",
+    re.IGNORECASE,
+)
+HASH_FIELDS = ('title', 'price', 'currency', 'address', 'latitude', 'longitude',
+               'rooms', 'total_area_m2', 'living_area_m2', 'kitchen_area_m2',
+               'floor', 'floors_total', 'year_built', 'description', 'images')
+
+
+def _variant(url):
+    """-> (id фото, (url, path, width, webp))."""
+    pu = urlparse(url)
+    m = _PATH_RE.match(pu.path) if pu.netloc == IMAGE_HOST else None
+    if not m:
+        return url, (url, pu.path, 0, False)
+    width = FULL_WIDTH if m.group("full") else int(m.group("w") or 0)
+    return m.group("key"), (url, pu.path, width, m.group("ext").lower() == "webp")
+
+
+def _best(variants, device):
+    ordered = sorted(variants, key=lambda v: (v[2], not v[3]))
+    for v in ordered:
+        if v[2] >= DEVICE_WIDTHS[device]:
+            return v
+    return ordered[-1]
+
+
+def canonicalize_images(urls):
+    photos = {}
+    for url in urls:
+        key, variant = _variant(url)
+        if key not in photos:
+            if len(photos) >= MAX_PHOTOS:
+                continue
+            photos[key] = []
+        if variant not in photos[key]:
+            photos[key].append(variant)
+    images, compact = [], []
+    for key, variants in photos.items():
+        d, m = _best(variants, "desktop"), _best(variants, "mobile")
+        images.append(d[0])
+        item = {"id": key, "d": d[1]}
+        if m[1] != d[1]:
+            item["m"] = m[1]
+        compact.append(item)
+    return images, compact
+
+
+def content_hash(obj):
+    payload = {f: getattr(obj, f) for f in HASH_FIELDS}
+    blob = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+def canonicalize_existing(apps, schema_editor):
+    """
+    Сворачиваем уже сохранённые списки фото до одного URL на фото.
+    Отпечаток пересчитываем: иначе первый recrawl примет новую форму
+    images за изменение объявления (лишние change_count и снимок).
+    """
+    Listing = apps.get_model('listings', 'Listing')
+    batch = []
+    for obj in Listing.objects.only('id', 'content_hash', *HASH_FIELDS).iterator():
+        if not obj.images:
+            continue
+        obj.images, obj.image_variants = canonicalize_images(obj.images)
+        if obj.content_hash:  # строки без отпечатка recrawl и так не считает изменёнными
+            obj.content_hash = content_hash(obj)
+        batch.append(obj)
+        if len(batch) >= 500:
+            Listing.objects.bulk_update(batch, ['images', 'image_variants', 'content_hash'])
+            batch = []
+    Listing.objects.bulk_update(batch, ['images', 'image_variants', 'content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0003_listingsnapshot_pricerollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(canonicalize_existing, migrations.RunPython.noop),
+    ]
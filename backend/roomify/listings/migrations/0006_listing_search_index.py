@@ -0,0 +1,96 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:00
+
+from django.db import migrations
+
+# SQLite: external-content FTS5 поверх listings_listing, синхронизация триггерами.
+# UPDATE-триггер срабатывает только при реальной смене текста, поэтому
+# обновление счётчиков recrawl индекс не трогает.
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE listings_listing_fts USING fts5(
+        title, description, address,
+        content='listings_listing', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER listings_listing_fts_ai AFTER INSERT ON listings_listing BEGIN
+        INSERT INTO listings_listing_fts(rowid, title, description, address)
+        VALUES (new.id, new.title, new.description, new.address);
+    END
+    """,
+    """
+    CREATE TRIGGER listings_listing_fts_ad AFTER DELETE ON listings_listing BEGIN
+        INSERT INTO listings_listing_fts(listings_listing_fts, rowid, title, description, address)
+        VALUES ('delete', old.id, old.title, old.description, old.address);
+    END
+    """,
+    """
+    CREATE TRIGGER listings_listing_fts_au AFTER UPDATE OF title, description, address
+    ON listings_listing
+    WHEN old.title IS NOT new.title OR old.description IS NOT new.description
+         OR old.address IS NOT new.address
+    BEGIN
+        INSERT INTO listings_listing_fts(listings_listing_fts, rowid, title, description, address)
+        VALUES ('delete', old.id, old.title, old.description, old.address);
+        INSERT INTO listings_listing_fts(rowid, title, description, address)
+        VALUES (new.id, new.title, new.description, new.address);
+    END
+    """,
+    "INSERT INTO listings_listing_fts(listings_listing_fts) VALUES ('rebuild')",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS listings_listing_fts_au",
+    "DROP TRIGGER IF EXISTS listings_listing_fts_ad",
+    "DROP TRIGGER IF EXISTS listings_listing_fts_ai",
+    "DROP TABLE IF EXISTS listings_listing_fts",
+]
+
+# Postgres: вычисляемый tsvector (веса: заголовок > адрес > описание) + GIN.
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE listings_listing ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(address, '')), 'B') ||
+        setweight(to_tsvector('russian', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX listings_listing_search_gin ON listings_listing USING GIN (search_vector)",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS listings_listing_search_gin",
+    "ALTER TABLE listings_listing DROP COLUMN IF EXISTS search_vector",
+]
+
+STATEMENTS = {
+    'sqlite': (SQLITE_FORWARD, SQLITE_BACKWARD),
+    'postgresql': (POSTGRES_FORWARD, POSTGRES_BACKWARD),
+}
+
+
+def _run(schema_editor, direction):
+    forward_backward = STATEMENTS.get(schema_editor.connection.vendor)
+    if forward_backward is None:
+        return  # другие БД: services/search.py откатится на icontains
+    for sql in forward_backward[direction]:
+        schema_editor.execute(sql)
+
+
+def forwards(apps, schema_editor):
+    _run(schema_editor, 0)
+
+
+def backwards(apps, schema_editor):
+    _run(schema_editor, 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0005_imageref'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0007_listing_dedup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FetchLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('host', models.CharField(max_length=255)),
+                ('at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+def drop_rollups(apps, schema_editor):
+    """Старые агрегаты смешивали валюты; их заново строит manage.py rollup_prices."""
+    apps.get_model('listings', 'PriceRollup').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0008_fetchlog'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='pricerollup',
+            name='rollup_day_rooms',
+        ),
+        migrations.AlterModelOptions(
+            name='pricerollup',
+            options={'ordering': ['day', 'rooms', 'currency']},
+        ),
+        migrations.AddField(
+            model_name='pricerollup',
+            name='currency',
+            field=models.CharField(blank=True, max_length=16),
+        ),
+        migrations.RunPython(drop_rollups, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='pricerollup',
+            constraint=models.UniqueConstraint(fields=('day', 'rooms', 'currency'), name='rollup_day_rooms_currency'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 class Listing(models.Model):
     source_url     = models.URLField(unique=True)
@@ -16,9 +17,21 @@ class Listing(models.Model):
     floors_total   = models.CharField(max_length=16, blank=True)
     year_built     = models.CharField(max_length=16, blank=True)
     description    = models.TextField(blank=True)
-    images         = models.JSONField(default=list, blank=True)   # список URLов
+    images         = models.JSONField(default=list, blank=True)   # список URLов, по одному на фото
+    image_variants = models.JSONField(default=list, blank=True)   # [{id, d, m}] — см. services/images.py
     raw            = models.JSONField(default=dict, blank=True)   # полный «сырой» dict на всякий
 
+    # для планировщика recrawl
+    content_hash    = models.CharField(max_length=40, blank=True)  # sha1 полей, см. services/ingest.py
+    fetch_count     = models.PositiveIntegerField(default=0)
+    change_count    = models.PositiveIntegerField(default=0)       # сколько раз контент реально менялся
+    view_count      = models.PositiveIntegerField(default=0)       # сигнал популярности
+    last_checked_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    # кластер повторных публикаций той же квартиры (services/dedup.py): ссылка на самое старое объявление
+    duplicate_of    = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL,
+                                        related_name='duplicates')
+
     created_at     = models.DateTimeField(auto_now_add=True)
     updated_at     = models.DateTimeField(auto_now=True)
 
@@ -27,3 +40,63 @@ class Listing(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+
+
+class ListingSnapshot(models.Model):
+    """
+    Append-only история: только изменившиеся поля + цена числом.
+    Пишется из services/history.py вместе с изменением объявления.
+    """
+    listing     = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='snapshots')
+    ts          = models.DateTimeField(default=timezone.now)
+    price_value = models.BigIntegerField(null=True, blank=True)   # цена в валюте объявления, целым
+    changes     = models.JSONField(default=dict, blank=True)      # {поле: новое значение}
+
+    class Meta:
+        indexes = [models.Index(fields=['listing', 'ts'], name='snapshot_listing_ts')]
+
+
+class PriceRollup(models.Model):
+    """Предпосчитанная медиана цены по количеству комнат и валюте за день (rollup_prices)."""
+    day          = models.DateField()
+    rooms        = models.PositiveSmallIntegerField(null=True, blank=True)  # null — не распознали
+    currency     = models.CharField(max_length=16, blank=True)   # цены в разных валютах не смешиваем
+    listings     = models.PositiveIntegerField()
+    median_price = models.BigIntegerField()
+
+    class Meta:
+        ordering = ['day', 'rooms', 'currency']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'rooms', 'currency'],
+                                    name='rollup_day_rooms_currency'),
+        ]
+
+
+class ImageRef(models.Model):
+    """key -> исходный URL фотографии для /api/img/<key> (см. services/imgproxy.py)."""
+    key        = models.CharField(max_length=32, primary_key=True)   # sha256(url)[:32]
+    url        = models.URLField(max_length=1024)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class ListingMinHash(models.Model):
+    """MinHash-подпись текста объявления (services/dedup.py)."""
+    listing   = models.OneToOneField(Listing, on_delete=models.CASCADE, primary_key=True,
+                                     related_name='minhash')
+    signature = models.BinaryField()   # array('I'), NUM_PERM значений
+
+
+class LshBucket(models.Model):
+    """LSH-индекс: по строке на полосу подписи; кандидаты в дубли — совпадение (band, bucket)."""
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name='lsh_buckets')
+    band    = models.PositiveSmallIntegerField()
+    bucket  = models.BigIntegerField()   # 64-битный хэш значений подписи в полосе
+
+    class Meta:
+        indexes = [models.Index(fields=['band', 'bucket'], name='lsh_band_bucket')]
+
+
+class FetchLog(models.Model):
+    """Исходящий запрос к источнику; общий для всех процессов бюджет recrawl (services/recrawl.py)."""
+    host = models.CharField(max_length=255)
+    at   = models.DateTimeField(db_index=True)
@@ -1,8 +1,80 @@
+import json
+
+from django.conf import settings
+from django.db.models import TextField
+from django.db.models.functions import Cast
+from django.utils import timezone
 from rest_framework import serializers
 from .models import Listing
 
+try:
+    import orjson
+except ImportError:  # orjson необязателен: без него тот же вывод через stdlib json
+    orjson = None
+
+
 class ListingSerializer(serializers.ModelSerializer):
     class Meta:
         model = Listing
         fields = '__all__'
-        read_only_fields = ('id', 'created_at', 'updated_at')
\ No newline at end of file
+        read_only_fields = ('id', 'created_at', 'updated_at')
+
+
+# ----------------------------- Быстрый путь чтения -----------------------------
+# Для списков: кортежи из .values_list() сразу в JSON, без экземпляров модели
+# и пополевой сериализации DRF. Ключи и значения — как у ListingSerializer
+# (FK — id, даты — ISO 8601 с Z), см. benchmarks/bench_listing_serializer.py.
+
+# порядок ключей — как у модели (и у DRF); FK в .values_list() по имени поля — это id
+_FIELD_ORDER = [f.name for f in Listing._meta.concrete_fields]
+READ_FIELDS = frozenset(_FIELD_ORDER)
+# «сырой» dict скрейпера большой и клиентам не нужен — только по явному ?fields=raw
+DEFAULT_READ_FIELDS = READ_FIELDS - {'raw'}
+# меняются через .update() (счётчики ingest/recrawl/views, кластеры dedup),
+# поэтому updated_at их не отражает — для ETag их значения читаем отдельно
+UNSAVED_FIELDS = frozenset({'view_count', 'fetch_count', 'last_checked_at', 'duplicate_of'})
+_DATETIME_FIELDS = frozenset(f.name for f in Listing._meta.concrete_fields
+                             if f.get_internal_type() == 'DateTimeField')
+_JSON_FIELDS = frozenset(f.name for f in Listing._meta.concrete_fields
+                         if f.get_internal_type() == 'JSONField')
+
+
+def ordered_fields(fields) -> list:
+    return [f for f in _FIELD_ORDER if f in fields]
+
+
+def listing_rows(qs, fields=DEFAULT_READ_FIELDS) -> list:
+    names = ordered_fields(fields)
+    if orjson is None:
+        rows = [dict(zip(names, row)) for row in qs.values_list(*names)]
+    else:
+        # JSON-колонки забираем текстом и разбираем orjson: конвертер JSONField
+        # (stdlib json.loads) — самая дорогая часть чтения images/raw
+        casts = {f'_{f}_text': Cast(f, TextField()) for f in _JSON_FIELDS.intersection(names)}
+        cols = [f'_{f}_text' if f in _JSON_FIELDS else f for f in names]
+        rows = [dict(zip(names, row)) for row in qs.annotate(**casts).values_list(*cols)]
+        for f in _JSON_FIELDS.intersection(names):
+            for r in rows:
+                if r[f] is not None:
+                    r[f] = orjson.loads(r[f])
+    # DRF отдаёт даты в текущей таймзоне; при UTC сервер уже вернул их в ней
+    dt_fields = _DATETIME_FIELDS.intersection(names)
+    if dt_fields and settings.USE_TZ and settings.TIME_ZONE != 'UTC':
+        for r in rows:
+            for f in dt_fields:
+                if r[f] is not None:
+                    r[f] = timezone.localtime(r[f])
+    return rows
+
+
+def _default(value):
+    if hasattr(value, 'isoformat'):
+        s = value.isoformat()
+        return s[:-6] + 'Z' if s.endswith('+00:00') else s
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_UTC_Z)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
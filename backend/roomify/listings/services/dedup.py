@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+"""
+dedup.py
+Поиск повторных публикаций одной квартиры (MinHash + LSH).
+
+Подпись — NUM_PERM минимумов хэшей словесных шинглов нормализованного
+заголовка и описания; доля совпавших позиций двух подписей оценивает
+сходство Жаккара множеств шинглов. Подпись режется на BANDS полос по
+ROWS значений, хэш полосы лежит в LshBucket с индексом (band, bucket):
+кандидаты — объявления, совпавшие хотя бы в одной полосе, т.е. несколько
+индексных выборок вместо сравнения со всей таблицей. Порог, с которого
+пара почти наверняка становится кандидатом, ≈ (1/BANDS) ** (1/ROWS) ≈ 0.71.
+
+Короткий текст (меньше MIN_SHINGLES шинглов, например только заголовок
+после частичного ingest) не индексируется: одинаковые «2-комнатная
+квартира» — не повод считать объявления одной квартирой.
+
+Кандидата подтверждаем по подписи (JACCARD_MIN) и по «физике»: хотя бы
+координаты (в пределах MAX_DISTANCE_M) или площадь (±AREA_TOLERANCE)
+должны быть известны у обоих и совпасть; известные у обоих комнаты должны
+быть равны, цены в одной валюте — отличаться не больше PRICE_TOLERANCE.
+Кластер — Listing.duplicate_of на самое старое объявление группы.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import random
+import re
+import typing as t
+import zlib
+from array import array
+
+from django.db import transaction
+from django.db.models import Q
+
+from ..models import Listing, ListingMinHash, LshBucket
+from .history import parse_price, parse_rooms
+
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 3
+MIN_SHINGLES = 20
+JACCARD_MIN = 0.8
+MAX_DISTANCE_M = 150.0
+AREA_TOLERANCE = 0.05
+PRICE_TOLERANCE = 0.15
+
+# поля, от которых зависит подпись и проверка кандидатов
+DEDUP_FIELDS = frozenset({'title', 'description', 'latitude', 'longitude', 'total_area_m2',
+                          'rooms', 'price', 'currency'})
+
+_PRIME = (1 << 61) - 1
+_MASK32 = 0xFFFFFFFF
+_rnd = random.Random(0x5EED)  # фиксированный seed: подписи в БД должны совпадать между запусками
+_PERMS = [(_rnd.randrange(1, _PRIME), _rnd.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+# ----------------------------- Подпись -----------------------------
+
+def normalize_text(text: str) -> t.List[str]:
+    return _WORD_RE.findall((text or "").lower().replace("ё", "е"))
+
+
+def shingles(title: str, description: str) -> t.Set[int]:
+    """crc32 словесных n-грамм; короткий текст — сами слова."""
+    words = normalize_text(f"{title} {description}")
+    if len(words) < SHINGLE_WORDS:
+        grams = words
+    else:
+        grams = [" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+    return {zlib.crc32(g.encode("utf-8")) for g in grams}
+
+
+def minhash(items: t.Collection[int]) -> t.Optional[array]:
+    if not items:
+        return None
+    xs = list(items)
+    return array('I', [min([(a * x + b) % _PRIME for x in xs]) & _MASK32 for a, b in _PERMS])
+
+
+def signature(title: str, description: str) -> t.Optional[array]:
+    """Подпись объявления или None, если текста слишком мало для сравнения."""
+    items = shingles(title, description)
+    return minhash(items) if len(items) >= MIN_SHINGLES else None
+
+
+def band_hashes(sig: array) -> t.List[int]:
+    """По знаковому 64-битному хэшу на полосу (влезает в BigIntegerField)."""
+    return [
+        int.from_bytes(hashlib.blake2b(sig[b * ROWS:(b + 1) * ROWS].tobytes(), digest_size=8,
+                                       person=b.to_bytes(2, "big")).digest(),
+                       "big", signed=True)
+        for b in range(BANDS)
+    ]
+
+
+def similarity(a: array, b: array) -> float:
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+def _load_sig(blob) -> array:
+    sig = array('I')
+    sig.frombytes(bytes(blob))
+    return sig
+
+
+# ----------------------------- Проверка кандидата -----------------------------
+
+def _distance_m(lat1, lon1, lat2, lon2) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    h = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * 6371000 * math.asin(math.sqrt(h))
+
+
+def same_apartment(a: t.Mapping, b: t.Mapping) -> bool:
+    """
+    Физическая проверка пары: координаты или площадь известны у обоих и
+    совпадают; комнаты и цены, если сравнимы, не противоречат друг другу.
+    """
+    compared = False
+    if None not in (a['latitude'], a['longitude'], b['latitude'], b['longitude']):
+        if _distance_m(a['latitude'], a['longitude'], b['latitude'], b['longitude']) > MAX_DISTANCE_M:
+            return False
+        compared = True
+    if a['total_area_m2'] and b['total_area_m2']:
+        lo, hi = sorted((a['total_area_m2'], b['total_area_m2']))
+        if (hi - lo) / hi > AREA_TOLERANCE:
+            return False
+        compared = True
+    if not compared:
+        return False
+
+    rooms_a, rooms_b = parse_rooms(a['rooms']), parse_rooms(b['rooms'])
+    if rooms_a is not None and rooms_b is not None and rooms_a != rooms_b:
+        return False
+    price_a, price_b = parse_price(a['price']), parse_price(b['price'])
+    if price_a and price_b and (a['currency'] or '') == (b['currency'] or ''):
+        lo, hi = sorted((price_a, price_b))
+        if (hi - lo) / hi > PRICE_TOLERANCE:
+            return False
+    return True
+
+
+_MATCH_FIELDS = ('latitude', 'longitude', 'total_area_m2', 'rooms', 'price', 'currency')
+
+
+# ----------------------------- Индекс при ingest -----------------------------
+
+def index_listing(obj: Listing) -> t.Optional[int]:
+    """
+    Пересчитывает подпись и полосы объявления и заново определяет его кластер.
+    Вызывается из upsert_listing при изменении DEDUP_FIELDS. Возвращает id
+    корня кластера или None, если дублей не нашлось.
+
+    Объявление сначала выходит из старого кластера; если оно было корнем,
+    его участники переиндексируются и собираются заново без него — иначе
+    они так и ссылались бы на объявление, с которым больше не совпадают.
+    """
+    with transaction.atomic():
+        orphans = _detach(obj)
+        root = _index_one(obj)
+        if orphans:
+            for member in Listing.objects.filter(pk__in=orphans).order_by('id'):
+                _index_one(member)
+    return root
+
+
+def _detach(obj: Listing) -> t.List[int]:
+    """Выводит obj из кластера; возвращает id бывших участников, если obj был корнем."""
+    orphans = list(Listing.objects.filter(duplicate_of=obj.pk).values_list('id', flat=True))
+    if orphans:
+        Listing.objects.filter(pk__in=orphans).update(duplicate_of=None)
+    if obj.duplicate_of_id is not None:
+        Listing.objects.filter(pk=obj.pk).update(duplicate_of=None)
+        obj.duplicate_of_id = None
+    return orphans
+
+
+def _index_one(obj: Listing) -> t.Optional[int]:
+    sig = signature(obj.title, obj.description)
+    with transaction.atomic():
+        LshBucket.objects.filter(listing=obj).delete()
+        if sig is None:
+            ListingMinHash.objects.filter(listing=obj).delete()
+            return None
+        ListingMinHash.objects.update_or_create(listing=obj, defaults={'signature': sig.tobytes()})
+        bands = band_hashes(sig)
+        LshBucket.objects.bulk_create(
+            [LshBucket(listing=obj, band=b, bucket=h) for b, h in enumerate(bands)]
+        )
+
+        cond = Q()
+        for b, h in enumerate(bands):
+            cond |= Q(band=b, bucket=h)
+        cand_ids = set(LshBucket.objects.filter(cond).exclude(listing=obj)
+                       .values_list('listing_id', flat=True))
+        if not cand_ids:
+            return None
+
+        me = {f: getattr(obj, f) for f in _MATCH_FIELDS}
+        places = {r['id']: r for r in Listing.objects.filter(pk__in=cand_ids)
+                  .values('id', 'duplicate_of_id', *_MATCH_FIELDS)}
+        matched = {
+            pk for pk, blob in ListingMinHash.objects.filter(listing_id__in=cand_ids)
+            .values_list('listing_id', 'signature')
+            if pk in places and similarity(sig, _load_sig(blob)) >= JACCARD_MIN
+            and same_apartment(me, places[pk])
+        }
+        roots = {places[pk]['duplicate_of_id'] or pk for pk in matched}
+        return _attach(obj, roots)
+
+
+def _attach(obj: Listing, roots: t.Set[int]) -> t.Optional[int]:
+    """Сливает найденные кластеры и obj (уже вне кластера) в один с корнем — самым старым id."""
+    if not roots:
+        return None
+    members = roots | {obj.pk}
+    root = min(members)
+    (Listing.objects.filter(Q(pk__in=members) | Q(duplicate_of__in=members))
+     .exclude(pk=root).update(duplicate_of=root))
+    Listing.objects.filter(pk=root).update(duplicate_of=None)
+    obj.duplicate_of_id = None if obj.pk == root else root
+    return root
+
+
+def cluster_of(listing_id: int) -> t.List[t.Dict]:
+    """Все объявления кластера, корень первым."""
+    row = Listing.objects.filter(pk=listing_id).values('id', 'duplicate_of_id').first()
+    if row is None:
+        return []
+    root = row['duplicate_of_id'] or row['id']
+    return list(Listing.objects.filter(Q(pk=root) | Q(duplicate_of=root))
+                .order_by('id').values('id', 'source_url', 'title', 'price', 'currency',
+                                       'created_at'))
+
+
+# ----------------------------- Полная перестройка -----------------------------
+
+def rebuild_index(batch_size: int = 1000) -> t.Tuple[int, int]:
+    """
+    Пересчитывает подписи и кластеры всей таблицы (бэкфилл / смена параметров).
+    Полосы группируются в памяти, кластеры — union-find по подтверждённым
+    парам. Возвращает (объявлений с подписью, объявлений-дублей).
+    """
+    sigs: t.Dict[int, array] = {}
+    places: t.Dict[int, t.Dict] = {}
+    buckets: t.Dict[t.Tuple[int, int], t.List[int]] = {}
+
+    with transaction.atomic():
+        LshBucket.objects.all().delete()
+        ListingMinHash.objects.all().delete()
+        sig_buf, band_buf = [], []
+        rows = (Listing.objects.order_by('id')
+                .values('id', 'title', 'description', *_MATCH_FIELDS).iterator(chunk_size=batch_size))
+        for r in rows:
+            sig = signature(r['title'], r['description'])
+            if sig is None:
+                continue
+            pk = r['id']
+            sigs[pk] = sig
+            places[pk] = {f: r[f] for f in _MATCH_FIELDS}
+            sig_buf.append(ListingMinHash(listing_id=pk, signature=sig.tobytes()))
+            for b, h in enumerate(band_hashes(sig)):
+                band_buf.append(LshBucket(listing_id=pk, band=b, bucket=h))
+                buckets.setdefault((b, h), []).append(pk)
+            if len(sig_buf) >= batch_size:
+                ListingMinHash.objects.bulk_create(sig_buf)
+                LshBucket.objects.bulk_create(band_buf, batch_size=batch_size * BANDS)
+                sig_buf, band_buf = [], []
+        ListingMinHash.objects.bulk_create(sig_buf)
+        LshBucket.objects.bulk_create(band_buf, batch_size=batch_size * BANDS)
+
+        parent: t.Dict[int, int] = {}
+
+        def find(x: int) -> int:
+            while parent.get(x, x) != x:
+                parent[x] = parent.get(parent[x], parent[x])
+                x = parent[x]
+            return x
+
+        checked: t.Set[t.Tuple[int, int]] = set()
+        for ids in buckets.values():
+            for i, a in enumerate(ids):
+                for b in ids[i + 1:]:
+                    if (a, b) in checked or find(a) == find(b):
+                        continue
+                    checked.add((a, b))
+                    if similarity(sigs[a], sigs[b]) >= JACCARD_MIN and same_apartment(places[a], places[b]):
+                        ra, rb = find(a), find(b)
+                        parent[max(ra, rb)] = min(ra, rb)
+
+        Listing.objects.exclude(duplicate_of=None).update(duplicate_of=None)
+        groups: t.Dict[int, t.List[int]] = {}
+        for pk in parent:
+            root = find(pk)
+            if root != pk:
+                groups.setdefault(root, []).append(pk)
+        for root, members in groups.items():
+            Listing.objects.filter(pk__in=members).update(duplicate_of=root)
+    return len(sigs), sum(len(m) for m in groups.values())
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+discovery.py
+Поиск новых объявлений krisha.kz без знания их URL.
+
+Конвейер генераторов:
+    источники (sitemap / страницы поиска) -> URL -> ad_id -> фильтр «уже есть» -> новые id
+
+Все запросы идут через http_client (кэш robots.txt + лимитер по хосту).
+Фильтр KnownIds — отсортированный array('q') id из Listing.source_url:
+8 байт на объявление, проверка бинарным поиском, без запроса в БД на
+каждого кандидата и без ложных срабатываний (в отличие от Bloom-фильтра).
+"""
+
+from __future__ import annotations
+
+import bisect
+import gzip
+import io
+import logging
+import re
+import typing as t
+from array import array
+from urllib.parse import urlencode, urlparse, parse_qsl, urlunparse
+from xml.etree import ElementTree as ET
+
+from ..models import Listing
+
+log = logging.getLogger(__name__)
+
+KRISHA_ROOT = "https://krisha.kz"
+DEFAULT_SITEMAP = f"{KRISHA_ROOT}/sitemap.xml"
+DEFAULT_SEARCH_URL = f"{KRISHA_ROOT}/prodazha/kvartiry/"
+
+AD_ID_RE = re.compile(r"/a/show/(\d+)")
+_AD_PATH_RE = re.compile(r"/a/show/(\d+)/?")
+KRISHA_HOSTS = frozenset({"krisha.kz", "www.krisha.kz"})
+# лимит протокола sitemaps — 50 МБ без сжатия; больше не качаем и не распаковываем
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024
+_SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+
+def canonical_ad_url(url: str) -> t.Optional[str]:
+    """
+    https://krisha.kz/a/show/<id> -> тот же URL в каноническом виде, иначе None.
+    Скрейпить по URL от пользователя можно только так: любой другой хост,
+    схема или путь (внутренние адреса, порты, user@host) отбрасываются.
+    """
+    pu = urlparse((url or "").strip())
+    if pu.scheme != "https" or pu.netloc not in KRISHA_HOSTS:
+        return None
+    m = _AD_PATH_RE.fullmatch(pu.path)
+    return f"{KRISHA_ROOT}/a/show/{int(m.group(1))}" if m else None
+
+
+# ----------------------------- Известные id -----------------------------
+
+class KnownIds:
+    """Множество id: большая неизменяемая отсортированная часть + свежедобавленные."""
+
+    def __init__(self, ids: t.Iterable[int] = ()):
+        self._sorted = array('q', sorted(set(ids)))
+        self._extra: t.Set[int] = set()
+
+    @classmethod
+    def from_db(cls) -> "KnownIds":
+        urls = Listing.objects.values_list('source_url', flat=True).iterator(chunk_size=10000)
+        return cls(int(m.group(1)) for m in map(AD_ID_RE.search, urls) if m)
+
+    def __contains__(self, ad_id: int) -> bool:
+        i = bisect.bisect_left(self._sorted, ad_id)
+        if i < len(self._sorted) and self._sorted[i] == ad_id:
+            return True
+        return ad_id in self._extra
+
+    def add(self, ad_id: int) -> None:
+        self._extra.add(ad_id)
+
+    def __len__(self) -> int:
+        return len(self._sorted) + len(self._extra)
+
+
+# ----------------------------- Источники -----------------------------
+
+def _get(url: str):
+    """GET с проверкой robots.txt. None — нельзя или ошибка (пропускаем источник)."""
+    from . import http_client
+
+    if not http_client.can_fetch(url):
+        log.info("robots.txt forbids %s", url)
+        return None
+    try:
+        resp = http_client.get(url)
+        resp.raise_for_status()
+    except Exception as e:
+        log.warning("discovery fetch failed for %s: %s", url, e)
+        return None
+    return resp
+
+
+def _fetch_sitemap(url: str) -> t.Optional[bytes]:
+    """Тело sitemap (распакованное, не больше SITEMAP_MAX_BYTES) или None."""
+    from . import http_client
+
+    if not http_client.can_fetch(url):
+        log.info("robots.txt forbids %s", url)
+        return None
+    try:
+        body, _ = http_client.fetch_bytes(url, max_bytes=SITEMAP_MAX_BYTES)
+        if url.endswith(".gz") or body[:2] == b"\x1f\x8b":
+            body = _gunzip(body, SITEMAP_MAX_BYTES)
+    except Exception as e:
+        log.warning("discovery fetch failed for %s: %s", url, e)
+        return None
+    return body
+
+
+def _gunzip(blob: bytes, max_bytes: int) -> bytes:
+    """Распаковка кусками: gzip-бомба обрывается на max_bytes, а не съедает память."""
+    chunks, size = [], 0
+    with gzip.GzipFile(fileobj=io.BytesIO(blob)) as f:
+        while True:
+            chunk = f.read(64 * 1024)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise ValueError(f"sitemap too large: >{max_bytes} bytes unpacked")
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def sitemap_roots(root: str = KRISHA_ROOT) -> t.List[str]:
+    """Sitemap: из robots.txt, иначе /sitemap.xml."""
+    from . import http_client
+
+    rp = http_client.robots.get(root)
+    maps = rp.site_maps() if rp is not None else None
+    return list(maps) if maps else [DEFAULT_SITEMAP]
+
+
+def iter_sitemap(url: str, _depth: int = 0) -> t.Iterator[str]:
+    """
+    Потоково отдаёт <loc> из sitemap; sitemapindex разворачивает рекурсивно
+    (дочерние карты качаем только когда потребитель дочитал текущую).
+    """
+    body = _fetch_sitemap(url)
+    if body is None:
+        return
+
+    children = []
+    for _, el in ET.iterparse(io.BytesIO(body), events=("end",)):
+        if el.tag == f"{_SITEMAP_NS}loc" or el.tag == "loc":
+            loc = (el.text or "").strip()
+            if loc and _is_sitemap(loc):
+                children.append(loc)
+            elif loc:
+                yield loc
+        el.clear()
+
+    if _depth < 3:
+        for child in children:
+            yield from iter_sitemap(child, _depth + 1)
+
+
+def _is_sitemap(loc: str) -> bool:
+    path = urlparse(loc).path
+    return path.endswith((".xml", ".xml.gz"))
+
+
+def _page_url(search_url: str, page: int) -> str:
+    pu = urlparse(search_url)
+    q = dict(parse_qsl(pu.query))
+    q["page"] = str(page)
+    return urlunparse(pu._replace(query=urlencode(q)))
+
+
+def iter_search_pages(search_url: str = DEFAULT_SEARCH_URL,
+                      max_pages: int = 10) -> t.Iterator[str]:
+    """
+    Страницы выдачи поиска: ссылки на объявления вытаскиваем регуляркой по
+    сырому HTML — BeautifulSoup тут не нужен. Пустая страница — конец выдачи.
+    """
+    for page in range(1, max_pages + 1):
+        resp = _get(_page_url(search_url, page))
+        if resp is None:
+            return
+        found = AD_ID_RE.findall(resp.text)
+        if not found:
+            return
+        for ad_id in found:
+            yield f"{KRISHA_ROOT}/a/show/{ad_id}"
+
+
+# ----------------------------- Конвейер -----------------------------
+
+def extract_ids(urls: t.Iterable[str]) -> t.Iterator[int]:
+    for url in urls:
+        m = AD_ID_RE.search(url)
+        if m:
+            yield int(m.group(1))
+
+
+def only_new(ids: t.Iterable[int], known: KnownIds) -> t.Iterator[int]:
+    for ad_id in ids:
+        if ad_id in known:
+            continue
+        known.add(ad_id)  # дубликаты внутри одного прохода тоже отсекаем
+        yield ad_id
+
+
+def discover(sources: t.Iterable[t.Iterable[str]],
+             known: t.Optional[KnownIds] = None) -> t.Iterator[int]:
+    """Ленивая цепочка: ничего не качается, пока потребитель не попросит следующий id."""
+    known = known if known is not None else KnownIds.from_db()
+    for urls in sources:
+        yield from only_new(extract_ids(urls), known)
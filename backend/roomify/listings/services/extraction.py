@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+extraction.py
+Общий «план извлечения» для обоих скрейперов.
+
+Каждая стадия парсинга (JSON-LD, OpenGraph, видимые блоки, <img>) объявляет,
+какие поля она умеет заполнять. По запрошенному набору полей строится план:
+стадии, которые не могут дать ничего нужного, не запускаются вовсе, а если
+после очередной стадии все «одиночные» поля уже заполнены — план
+останавливается раньше.
+
+Использование:
+    plan = ExtractionPlan(STAGES, fields={"title", "images"})
+    plan.run(listing, soup, is_filled=lambda f: ...)
+"""
+
+from __future__ import annotations
+
+import typing as t
+from dataclasses import dataclass
+
+# Все поля, которые умеет отдавать парсер объявления (кроме служебного url).
+LISTING_FIELDS = frozenset({
+    "title", "price", "currency", "address", "latitude", "longitude",
+    "rooms", "total_area_m2", "living_area_m2", "kitchen_area_m2",
+    "floor", "floors_total", "year_built", "description", "images",
+})
+
+# Поля, которые отдаёт scrape_listing_by_id (krisha_scraper). Лежат здесь,
+# чтобы view мог проверить ?fields= без импорта скрейпера.
+BY_ID_FIELDS = frozenset({"title", "description", "images"})
+
+# Поля-«накопители»: их пополняет каждая стадия, поэтому заполненность
+# после JSON-LD не означает, что остальные стадии можно пропустить.
+ACCUMULATING_FIELDS = frozenset({"images"})
+
+
+def normalize_fields(fields: t.Optional[t.Iterable[str]],
+                     known: t.FrozenSet[str] = LISTING_FIELDS) -> t.FrozenSet[str]:
+    """
+    None -> все поля. Строку "title,images" тоже принимаем (удобно для ?fields=).
+    Неизвестные поля — ValueError, чтобы опечатка не превращалась в пустой ответ.
+    """
+    if fields is None:
+        return known
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    wanted = frozenset(str(f).strip() for f in fields if f and str(f).strip())
+    if not wanted:
+        return known
+    unknown = wanted - known
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(sorted(unknown))}")
+    return wanted
+
+
+def is_empty(v) -> bool:
+    return v is None or v == "" or v == [] or v == {}
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    provides: t.FrozenSet[str]
+    run: t.Callable[..., None]
+
+
+class ExtractionPlan:
+    """
+    Упорядоченный список стадий, отфильтрованный по запрошенным полям.
+    Стадии вызываются как stage.run(*args) — сигнатуру задаёт сам скрейпер.
+    """
+
+    def __init__(self, stages: t.Sequence[Stage],
+                 fields: t.Optional[t.Iterable[str]] = None,
+                 known: t.FrozenSet[str] = LISTING_FIELDS):
+        self.fields = normalize_fields(fields, known)
+        self.stages = [s for s in stages if s.provides & self.fields]
+        self.executed: t.List[str] = []
+
+    def pending(self, is_filled: t.Callable[[str], bool]) -> t.FrozenSet[str]:
+        """Поля, ради которых ещё стоит запускать стадии."""
+        return frozenset(
+            f for f in self.fields
+            if f in ACCUMULATING_FIELDS or not is_filled(f)
+        )
+
+    def run(self, *args, is_filled: t.Callable[[str], bool]) -> None:
+        for stage in self.stages:
+            pending = self.pending(is_filled)
+            if not pending:
+                break
+            if not stage.provides & pending:
+                continue
+            stage.run(*args)
+            self.executed.append(stage.name)
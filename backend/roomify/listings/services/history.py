@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+history.py
+История цен/атрибутов (ListingSnapshot) и дневные агрегаты (PriceRollup).
+
+Снимок пишет upsert_listing в той же транзакции, что и само объявление.
+Агрегаты считаются батчем (manage.py rollup_prices): один потоковый проход по
+снимкам в порядке индекса (listing, ts), поэтому API рынка читает только
+маленькую таблицу PriceRollup.
+"""
+
+from __future__ import annotations
+
+import re
+import statistics
+import typing as t
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from ..models import Listing, ListingSnapshot, PriceRollup
+
+# сырой dict и производную от images карту размеров в историю не пишем
+SNAPSHOT_EXCLUDE = frozenset({'raw', 'image_variants'})
+# дольше без проверки цену объявления в агрегаты не переносим (скорее всего, снято)
+STALE_AFTER = timedelta(days=14)
+
+_PRICE_RE = re.compile(r"\d+(?:[.,]\d+)?")
+_INT_RE = re.compile(r"\d+")
+
+
+def parse_price(price: t.Optional[str]) -> t.Optional[int]:
+    """'35 000 000 〒' -> 35000000."""
+    if not price:
+        return None
+    m = _PRICE_RE.search(str(price).replace("\u00A0", "").replace(" ", ""))
+    if not m:
+        return None
+    return int(float(m.group(0).replace(",", ".")))
+
+
+def parse_rooms(rooms: t.Optional[str]) -> t.Optional[int]:
+    """'2-комнатная' / '2' -> 2."""
+    m = _INT_RE.search(rooms or "")
+    return int(m.group(0)) if m else None
+
+
+def diff_fields(before: t.Dict, after: t.Dict) -> t.Dict:
+    return {k: v for k, v in after.items()
+            if k not in SNAPSHOT_EXCLUDE and before.get(k) != v}
+
+
+def write_snapshot(listing: Listing, changes: t.Dict,
+                   ts: t.Optional[datetime] = None) -> ListingSnapshot:
+    """Один снимок; upsert_listing зовёт его внутри своей транзакции."""
+    return ListingSnapshot.objects.create(
+        listing=listing,
+        ts=ts or timezone.now(),
+        price_value=parse_price(listing.price),
+        changes=changes,
+    )
+
+
+def price_timeline(listing_id: int) -> t.List[t.Dict]:
+    """Только точки, где цена реально менялась (по индексу listing, ts)."""
+    out: t.List[t.Dict] = []
+    rows = (ListingSnapshot.objects
+            .filter(listing_id=listing_id, price_value__isnull=False)
+            .order_by('ts')
+            .values_list('ts', 'price_value'))
+    for ts, price in rows:
+        if not out or out[-1]['price'] != price:
+            out.append({'ts': ts, 'price': price})
+    return out
+
+
+def _day_end(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+def rebuild_rollups(since: date, until: t.Optional[date] = None) -> int:
+    """
+    Пересчитывает PriceRollup за [since, until]. Цена объявления на день D —
+    последний снимок до конца D, если объявление видели (last_checked_at или
+    снимок) не раньше чем за STALE_AFTER до конца D: снятые с публикации
+    объявления не тянут старую цену в медиану бесконечно. Группы —
+    (день, комнаты, валюта). Возвращает число записанных строк.
+    """
+    until = until or timezone.localdate()
+    days = [since + timedelta(days=i) for i in range((until - since).days + 1)]
+    if not days:
+        return 0
+    ends = [_day_end(d) for d in days]
+    start = ends[0] - timedelta(days=1)
+    prices: t.Dict[t.Tuple[date, t.Optional[int], str], t.List[int]] = defaultdict(list)
+
+    # до since нужен только последний снимок объявления — точка отсчёта;
+    # по индексу (listing, ts) это один seek, а не скан всей истории
+    anchor = (ListingSnapshot.objects
+              .filter(listing_id=OuterRef('pk'), price_value__isnull=False, ts__lt=start)
+              .order_by('-ts'))
+    listings = (Listing.objects
+                .annotate(anchor_ts=Subquery(anchor.values('ts')[:1]),
+                          anchor_price=Subquery(anchor.values('price_value')[:1]))
+                .order_by('id')
+                .values_list('id', 'rooms', 'currency', 'last_checked_at',
+                             'anchor_ts', 'anchor_price')
+                .iterator(chunk_size=5000))
+    snaps = (ListingSnapshot.objects
+             .filter(price_value__isnull=False, ts__gte=start, ts__lt=ends[-1])
+             .order_by('listing_id', 'ts')
+             .values_list('listing_id', 'ts', 'price_value')
+             .iterator(chunk_size=5000))
+
+    def emit(timeline, key, last_seen):
+        # timeline отсортирован по ts: идём по дням и по точкам одновременно
+        i, current = 0, None
+        for day, end in zip(days, ends):
+            if last_seen < end - STALE_AFTER:
+                break  # дальше объявление только «старее»
+            while i < len(timeline) and timeline[i][0] < end:
+                current = timeline[i][1]
+                i += 1
+            if current is not None:
+                prices[(day, *key)].append(current)
+
+    # оба потока упорядочены по id объявления — сливаем их за один проход
+    snap = next(snaps, None)
+    for pk, raw_rooms, currency, checked, anchor_ts, anchor_price in listings:
+        timeline = [(anchor_ts, anchor_price)] if anchor_ts is not None else []
+        while snap is not None and snap[0] < pk:  # объявление удалили между запросами
+            snap = next(snaps, None)
+        while snap is not None and snap[0] == pk:
+            timeline.append(snap[1:])
+            snap = next(snaps, None)
+        if timeline:
+            last_seen = max(checked or timeline[-1][0], timeline[-1][0])
+            emit(timeline, (parse_rooms(raw_rooms), currency), last_seen)
+
+    rollups = [
+        PriceRollup(day=day, rooms=rooms, currency=currency, listings=len(vals),
+                    median_price=int(statistics.median(vals)))
+        for (day, rooms, currency), vals in prices.items()
+    ]
+    with transaction.atomic():
+        PriceRollup.objects.filter(day__gte=since, day__lte=until).delete()
+        PriceRollup.objects.bulk_create(rollups, batch_size=1000)
+    return len(rollups)
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+http_client.py
+Общий HTTP-слой скрейперов: один requests.Session с пулом соединений,
+кэш robots.txt и вежливый лимитер запросов по хостам.
+
+Раньше каждый вызов делал новый TCP/TLS-хендшейк, заново качал robots.txt
+и безусловно спал RESPECT_DELAY_SEC. Теперь соединения переиспользуются,
+robots.txt живёт ROBOTS_TTL_SEC, а пауза выдерживается только между
+запросами к одному и тому же хосту.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+import typing as t
+from urllib.parse import urlparse, urljoin
+import urllib.robotparser as robotparser
+
+import requests
+from requests.adapters import HTTPAdapter
+
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/128.0 Safari/537.36"
+    ),
+    "Accept-Language": "ru,en;q=0.9",
+}
+REQUEST_TIMEOUT = 20  # секунд
+RESPECT_DELAY_SEC = 1.0  # пауза между запросами к одному хосту (вежливость)
+ROBOTS_TTL_SEC = 3600
+POOL_SIZE = 10
+
+# CDN фотографий отдаёт статику, ему хватает паузы поменьше
+HOST_DELAYS: t.Dict[str, float] = {
+    "krisha-photos.kcdn.online": 0.1,
+}
+# запросы к этим хостам не тратят общий бюджет recrawl (статика, не страницы)
+UNMETERED_HOSTS = frozenset({"krisha-photos.kcdn.online"})
+
+# Колбэки host -> None на каждый учитываемый запрос. Бюджет recrawl
+# подключает Django-приложение (ListingsConfig.ready); сам транспорт от
+# ORM не зависит и работает из командной строки без настроек Django.
+fetch_hooks: t.List[t.Callable[[str], None]] = []
+
+
+# ----------------------------- Сессия -----------------------------
+
+_session: t.Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                s.headers.update(HEADERS)
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                _install_replay(s)
+                _session = s
+    return _session
+
+
+def _install_replay(s: requests.Session) -> None:
+    """KRISHA_HTTP_MODE=record|replay — подменяем транспорт (см. replay.py)."""
+    from .replay import adapter_from_env
+
+    adapter = adapter_from_env()
+    if adapter is None:
+        return
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    if os.environ.get("KRISHA_HTTP_MODE") == "replay" and os.environ.get("KRISHA_REPLAY_KEEP_DELAY") != "1":
+        # в нагрузочном тесте паузы вежливости только мешают мерить сам стек
+        limiter.default_delay = 0.0
+        limiter.delays.clear()
+
+
+def mount(prefix: str, adapter: requests.adapters.BaseAdapter) -> None:
+    """Подменить транспорт для префикса URL (например, в тестах/нагрузке)."""
+    get_session().mount(prefix, adapter)
+
+
+# ----------------------------- Лимитер -----------------------------
+
+class HostRateLimiter:
+    """Минимальный интервал между запросами к одному хосту (между потоками тоже)."""
+
+    def __init__(self, default_delay: float = RESPECT_DELAY_SEC,
+                 delays: t.Optional[t.Dict[str, float]] = None):
+        self.default_delay = default_delay
+        self.delays = dict(delays or {})
+        self._next: t.Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host: str) -> None:
+        delay = self.delays.get(host, self.default_delay)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, 0.0))
+            self._next[host] = slot + delay
+        if slot > now:
+            time.sleep(slot - now)
+
+
+limiter = HostRateLimiter(delays=HOST_DELAYS)
+
+
+# ----------------------------- robots.txt -----------------------------
+
+class RobotsCache:
+    def __init__(self, ttl: float = ROBOTS_TTL_SEC):
+        self.ttl = ttl
+        self._cache: t.Dict[str, t.Tuple[float, t.Optional[robotparser.RobotFileParser]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, base: str) -> t.Optional[robotparser.RobotFileParser]:
+        """None — robots.txt недоступен, трактуем как «можно»."""
+        now = time.monotonic()
+        with self._lock:
+            hit = self._cache.get(base)
+        if hit and hit[0] > now:
+            return hit[1]
+        rp = self._load(base)
+        with self._lock:
+            self._cache[base] = (now + self.ttl, rp)
+        return rp
+
+    def _load(self, base: str) -> t.Optional[robotparser.RobotFileParser]:
+        robots_url = urljoin(base, "/robots.txt")
+        try:
+            resp = get(robots_url)
+        except requests.RequestException:
+            # В случае сетевой ошибки — по умолчанию разрешаем (или смените на False).
+            return None
+        if resp.status_code >= 400:
+            # Если robots.txt недоступен — трактуем аккуратно, но даём пройти (обычная практика).
+            return None
+        rp = robotparser.RobotFileParser()
+        rp.parse(resp.text.splitlines())
+        return rp
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+
+robots = RobotsCache()
+
+
+def can_fetch(url: str) -> bool:
+    """Проверка robots.txt: можно ли ходить по этому URL."""
+    parsed = urlparse(url)
+    rp = robots.get(f"{parsed.scheme}://{parsed.netloc}")
+    return True if rp is None else rp.can_fetch(HEADERS["User-Agent"], url)
+
+
+# ----------------------------- Запросы -----------------------------
+
+def get(url: str, **kwargs) -> requests.Response:
+    """
+    GET через общую сессию с учётом лимитера. Статус не проверяет.
+    Запросы к источнику (не к UNMETERED_HOSTS) отдаются в fetch_hooks.
+    """
+    host = urlparse(url).netloc
+    limiter.wait(host)
+    if host not in UNMETERED_HOSTS:
+        for hook in fetch_hooks:
+            hook(host)
+    kwargs.setdefault("timeout", REQUEST_TIMEOUT)
+    return get_session().get(url, **kwargs)
+
+
+def fetch_html(url: str) -> str:
+    resp = get(url)
+    resp.raise_for_status()
+    return resp.text
+
+
+def fetch_bytes(url: str, max_bytes: int = 15 * 1024 * 1024) -> t.Tuple[bytes, str]:
+    """-> (тело, content-type). Большие ответы обрываем, не дочитывая."""
+    resp = get(url, stream=True)
+    try:
+        resp.raise_for_status()
+        chunks, size = [], 0
+        for chunk in resp.iter_content(64 * 1024):
+            size += len(chunk)
+            if size > max_bytes:
+                raise ValueError(f"response too large: >{max_bytes} bytes")
+            chunks.append(chunk)
+        return b"".join(chunks), resp.headers.get("Content-Type", "")
+    finally:
+        resp.close()
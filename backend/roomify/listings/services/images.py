@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+images.py
+Канонизация URL фотографий krisha-photos.kcdn.online.
+
+Одна и та же фотография отдаётся под разными путями и размерами:
+    /webp/0e/0e5d…/1-750x470.webp
+    /photos/0e/0e5d…/1-750x470.jpg
+    /photos/0e/0e5d…/1-full.jpg
+Группируем варианты по id фото (0e/0e5d…/1), для каждого класса устройств
+выбираем лучший вариант и храним компактно — пути без хоста:
+    [{"id": "0e/0e5d…/1", "d": "/photos/…-full.jpg", "m": "/webp/…-400x300.webp"}]
+("m" опускаем, если совпадает с "d").
+"""
+
+from __future__ import annotations
+
+import re
+import typing as t
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+IMAGE_HOST = "krisha-photos.kcdn.online"
+MAX_PHOTOS = 30
+
+# целевая ширина для класса устройств: берём наименьший вариант не уже неё
+DEVICE_WIDTHS = {
+    "mobile": 400,
+    "desktop": 1200,
+}
+FULL_WIDTH = 10 ** 6  # «-full» — оригинал, шире любого ресайза
+
+_PATH_RE = re.compile(
+    r"^/(?P<root>webp|photos|images|img)/(?P<key>.+?)"
+    r"(?:-(?P<w>\d+)x(?P<h>\d+)|-(?P<full>full))?"
+    r"\.(?P<ext>jpe?g|png|webp|gif)$",
+    re.IGNORECASE,
+)
+
+
+@dataclass(frozen=True)
+class Variant:
+    url: str
+    path: str
+    width: int   # 0 — размер неизвестен
+    webp: bool
+
+
+@dataclass
+class Photo:
+    key: str
+    variants: t.List[Variant] = field(default_factory=list)
+
+    def best(self, device: str = "desktop") -> Variant:
+        target = DEVICE_WIDTHS[device]
+        # webp легче при той же ширине, поэтому при равенстве он впереди
+        ordered = sorted(self.variants, key=lambda v: (v.width, not v.webp))
+        for v in ordered:
+            if v.width >= target:
+                return v
+        return ordered[-1]
+
+
+ALLOWED_IMAGE_ROOTS = ("/webp/", "/photos/", "/images/", "/img/")
+ALLOWED_IMAGE_EXT = (".jpg", ".jpeg", ".png", ".webp", ".gif")
+
+
+def accept_image_url(u: str) -> bool:
+    """Только https-фото объявлений с CDN krisha (без рекламных /content/)."""
+    if not u or not u.startswith("http"):
+        return False
+    pu = urlparse(u)
+    if pu.scheme != "https" or pu.netloc != IMAGE_HOST:
+        return False
+    if pu.path.startswith("/content/"):
+        return False
+    if not pu.path.startswith(ALLOWED_IMAGE_ROOTS):
+        return False
+    return pu.path.lower().endswith(ALLOWED_IMAGE_EXT)
+
+
+def parse_image_url(url: str) -> t.Optional[t.Tuple[str, Variant]]:
+    """URL -> (id фото, вариант). None, если URL не похож на фото объявления."""
+    pu = urlparse(url)
+    if pu.netloc != IMAGE_HOST:
+        return None
+    m = _PATH_RE.match(pu.path)
+    if not m:
+        return None
+    if m.group("full"):
+        width = FULL_WIDTH
+    elif m.group("w"):
+        width = int(m.group("w"))
+    else:
+        width = 0
+    webp = m.group("ext").lower() == "webp"
+    return m.group("key"), Variant(url=url, path=pu.path, width=width, webp=webp)
+
+
+def group_photos(urls: t.Iterable[str], limit: int = MAX_PHOTOS) -> t.List[Photo]:
+    """Группирует варианты по фото, сохраняя порядок первого появления."""
+    photos: t.Dict[str, Photo] = {}
+    for url in urls:
+        parsed = parse_image_url(url)
+        if parsed is None:
+            # незнакомый формат — считаем отдельной фотографией
+            key, variant = url, Variant(url=url, path=urlparse(url).path, width=0, webp=False)
+        else:
+            key, variant = parsed
+        photo = photos.get(key)
+        if photo is None:
+            if len(photos) >= limit:
+                continue
+            photo = photos[key] = Photo(key)
+        if variant not in photo.variants:
+            photo.variants.append(variant)
+    return list(photos.values())
+
+
+def compact_variants(photos: t.Iterable[Photo]) -> t.List[t.Dict[str, str]]:
+    out = []
+    for p in photos:
+        d, m = p.best("desktop").path, p.best("mobile").path
+        item = {"id": p.key, "d": d}
+        if m != d:
+            item["m"] = m
+        out.append(item)
+    return out
+
+
+def variant_url(item: t.Dict[str, str], device: str = "desktop") -> str:
+    path = item.get("m", item["d"]) if device == "mobile" else item["d"]
+    return f"https://{IMAGE_HOST}{path}"
+
+
+def canonicalize_images(urls: t.Iterable[str], limit: int = MAX_PHOTOS
+                        ) -> t.Tuple[t.List[str], t.List[t.Dict[str, str]]]:
+    """
+    -> (images, image_variants): по одному URL на фото (лучший для desktop)
+    и компактная карта вариантов для остальных классов устройств.
+    """
+    photos = group_photos(urls, limit)
+    return [p.best("desktop").url for p in photos], compact_variants(photos)
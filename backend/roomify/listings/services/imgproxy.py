@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+imgproxy.py
+Локальный прокси фотографий с миниатюрами и on-disk LRU.
+
+    /api/img/<key>?w=400  ->  <IMAGE_CACHE_DIR>/<key[:2]>/<key>-400.webp
+
+key — sha256(url)[:32], соответствие key -> url хранит ImageRef (его
+заполняет register_images, когда URL отдаются клиенту). Первый запрос
+качает оригинал через общий HTTP-слой и делает WebP-миниатюру в пуле
+потоков; повторные — чтение локального файла. Содержимое по ключу
+никогда не меняется, поэтому ETag строгий, а кэш клиента — immutable.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import typing as t
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+
+from ..models import ImageRef
+
+ALLOWED_WIDTHS = (200, 400, 800, 1200)
+DEFAULT_WIDTH = 400
+WEBP_QUALITY = 80
+THUMB_TIMEOUT_SEC = 30
+
+
+def image_key(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+
+
+def register_images(urls: t.Iterable[str]) -> t.Dict[str, str]:
+    """url -> key; новые пары пишем одним INSERT (дубликаты игнорируются)."""
+    keys = {u: image_key(u) for u in urls}
+    if keys:
+        ImageRef.objects.bulk_create(
+            [ImageRef(key=k, url=u) for u, k in keys.items()],
+            ignore_conflicts=True,
+        )
+    return keys
+
+
+def is_registered(key: str) -> bool:
+    return ImageRef.objects.filter(key=key).exists()
+
+
+def etag(key: str, width: int) -> str:
+    return f'"{key}-{width}"'
+
+
+# ----------------------------- Дисковый LRU -----------------------------
+
+class DiskLRU:
+    """
+    Файлы кэша + индекс «имя -> размер» в порядке последнего доступа.
+    Индекс строится лениво по mtime; при попадании mtime обновляется, так
+    что после рестарта порядок вытеснения сохраняется. Каждый процесс
+    держит свой индекс: чужое вытеснение для нас просто промах.
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._index: t.Optional[OrderedDict[str, int]] = None
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def _path(self, name: str) -> Path:
+        return self.root / name[:2] / name
+
+    def _load_index(self) -> None:
+        entries = []
+        if self.root.exists():
+            for sub in os.scandir(self.root):
+                if not sub.is_dir():
+                    continue
+                for f in os.scandir(sub.path):
+                    if f.is_file() and not f.name.startswith("."):
+                        st = f.stat()
+                        entries.append((st.st_mtime, f.name, st.st_size))
+        entries.sort()
+        self._index = OrderedDict((name, size) for _, name, size in entries)
+        self._total = sum(size for _, _, size in entries)
+
+    def get(self, name: str) -> t.Optional[Path]:
+        path = self._path(name)
+        with self._lock:
+            if self._index is None:
+                self._load_index()
+            if name not in self._index:
+                # мог записать другой процесс — подхватываем его файл
+                try:
+                    size = path.stat().st_size
+                except FileNotFoundError:
+                    return None
+                self._index[name] = size
+                self._total += size
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                self._total -= self._index.pop(name)
+                return None
+            self._index.move_to_end(name)
+        return path
+
+    def put(self, name: str, data: bytes) -> Path:
+        path = self._path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # атомарная запись: читатель не увидит недописанный файл
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            if self._index is None:
+                self._load_index()
+            self._total -= self._index.pop(name, 0)
+            self._index[name] = len(data)
+            self._total += len(data)
+            self._evict()
+        return path
+
+    def _evict(self) -> None:
+        while self._total > self.max_bytes and len(self._index) > 1:
+            old, size = self._index.popitem(last=False)
+            self._total -= size
+            try:
+                os.unlink(self._path(old))
+            except FileNotFoundError:
+                pass
+
+
+# ----------------------------- Миниатюры -----------------------------
+
+def make_thumbnail(data: bytes, width: int) -> bytes:
+    from PIL import Image  # Pillow нужен только воркерам прокси
+
+    with Image.open(io.BytesIO(data)) as im:
+        im.draft("RGB", (width, width))  # JPEG декодируется сразу в уменьшенном масштабе
+        if im.width > width:
+            im.thumbnail((width, round(im.height * width / im.width)))
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGB")
+        out = io.BytesIO()
+        im.save(out, "WEBP", quality=WEBP_QUALITY, method=4)
+        return out.getvalue()
+
+
+_executor: t.Optional[ThreadPoolExecutor] = None
+_cache: t.Optional[DiskLRU] = None
+_init_lock = threading.Lock()
+_inflight: t.Dict[str, threading.Lock] = {}
+_inflight_lock = threading.Lock()
+
+
+def _setup() -> t.Tuple[ThreadPoolExecutor, DiskLRU]:
+    global _executor, _cache
+    if _executor is None:
+        with _init_lock:
+            if _executor is None:
+                _cache = DiskLRU(settings.IMAGE_CACHE_DIR, settings.IMAGE_CACHE_MAX_BYTES)
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_PROXY_WORKERS,
+                    thread_name_prefix="imgproxy",
+                )
+    return _executor, _cache
+
+
+class ImageNotFound(Exception):
+    pass
+
+
+def get_thumbnail(key: str, width: int) -> Path:
+    """
+    Путь к готовому файлу миниатюры. Кэш-промах: качаем и ресайзим; на один
+    ключ одновременно работает только один запрос, остальные ждут его файл.
+    """
+    from .http_client import can_fetch, fetch_bytes
+    from .images import accept_image_url
+
+    executor, cache = _setup()
+    name = f"{key}-{width}.webp"
+    path = cache.get(name)
+    if path is not None:
+        return path
+
+    with _inflight_lock:
+        lock = _inflight.setdefault(name, threading.Lock())
+    with lock:
+        try:
+            path = cache.get(name)
+            if path is not None:
+                return path
+            url = ImageRef.objects.filter(key=key).values_list("url", flat=True).first()
+            if not url or not accept_image_url(url):
+                raise ImageNotFound(key)
+            if not can_fetch(url):
+                raise PermissionError("robots.txt forbids this URL")
+            data, _ = fetch_bytes(url)
+            thumb = executor.submit(make_thumbnail, data, width).result(THUMB_TIMEOUT_SEC)
+            return cache.put(name, thumb)
+        finally:
+            with _inflight_lock:
+                _inflight.pop(name, None)
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+ingest.py
+Upsert результата скрейпера в Listing. Общий код для IngestView и recrawl.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import typing as t
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import Listing
+from . import dedup
+from .extraction import LISTING_FIELDS
+from .history import diff_fields, write_snapshot
+
+# маппинг dict → поля модели
+MODEL_FIELDS = ('title', 'price', 'currency', 'address', 'latitude', 'longitude',
+                'rooms', 'total_area_m2', 'living_area_m2', 'kitchen_area_m2',
+                'floor', 'floors_total', 'year_built', 'description', 'images',
+                'image_variants')
+# image_variants выводится из images, в отпечаток не входит: формула та же,
+# что до его появления (её же заморозила миграция 0004)
+HASH_FIELDS = tuple(f for f in MODEL_FIELDS if f != 'image_variants')
+
+
+def content_hash(obj: Listing) -> str:
+    """Отпечаток содержимого: по нему recrawl понимает, менялось ли объявление."""
+    payload = {f: getattr(obj, f) for f in HASH_FIELDS}
+    blob = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+def upsert_listing(url: str, data: t.Dict,
+                   fields: t.FrozenSet[str] = LISTING_FIELDS) -> t.Tuple[Listing, bool, bool]:
+    """
+    Возвращает (obj, created, changed).
+    Если содержимое не изменилось, пишем только счётчики через .update(),
+    чтобы updated_at (auto_now) оставался временем последнего изменения.
+    Новые и изменившиеся по тексту/месту объявления проходят через dedup.
+    Снимок изменений пишется в той же транзакции, что и save(): история не
+    теряется при падении и не отстаёт от updated_at (ETag истории цен).
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        obj, created = Listing.objects.select_for_update().get_or_create(
+            source_url=url
+        )
+        before = {f: getattr(obj, f) for f in MODEL_FIELDS}
+        for f in MODEL_FIELDS:
+            if f in data:
+                setattr(obj, f, data[f])
+        new_hash = content_hash(obj)
+        changed = created or new_hash != obj.content_hash
+
+        if not changed:
+            Listing.objects.filter(pk=obj.pk).update(
+                fetch_count=F('fetch_count') + 1, last_checked_at=now,
+            )
+            obj.refresh_from_db(fields=['fetch_count', 'last_checked_at'])
+            return obj, created, changed
+
+        # частичный парсинг не должен затирать остальной «сырой» dict
+        obj.raw = data if fields == LISTING_FIELDS else {**(obj.raw or {}), **data}
+        if not created and obj.content_hash:  # у старых строк отпечатка ещё нет
+            obj.change_count += 1
+        obj.content_hash = new_hash
+        obj.fetch_count += 1
+        obj.last_checked_at = now
+        obj.save()
+
+        changes = diff_fields({} if created else before,
+                              {f: getattr(obj, f) for f in MODEL_FIELDS})
+        if created or dedup.DEDUP_FIELDS.intersection(changes):
+            dedup.index_listing(obj)
+        write_snapshot(obj, changes, ts=now)
+    return obj, created, changed
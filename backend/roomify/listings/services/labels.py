@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+labels.py
+Предкомпилированное сопоставление «лейбл -> поля объявления».
+
+Раньше каждая пара «лейбл : значение» проходила цепочку из ~30 проверок
+`"подстрока" in label`. Теперь все ключевые подстроки собраны в одну
+регулярку-альтернацию с lookahead, поэтому за один проход находятся и
+перекрывающиеся вхождения («площадь» внутри «общая площадь»). Результат
+классификации кэшируется по сырому лейблу — на странице и между страницами
+лейблы повторяются постоянно.
+
+Семантика правил 1:1 повторяет прежние цепочки `in`:
+правило срабатывает, если для каждой группы хоть одна подстрока есть в
+лейбле и ни одной подстроки из none_of.
+"""
+
+from __future__ import annotations
+
+import re
+import typing as t
+from functools import lru_cache
+
+# (поле, группы «хотя бы одно из», «ни одного из»)
+Rule = t.Tuple[str, t.Tuple[t.FrozenSet[str], ...], t.FrozenSet[str]]
+
+
+def _rule(field: str, *groups: t.Iterable[str], none_of: t.Iterable[str] = ()) -> Rule:
+    return field, tuple(frozenset(g) for g in groups), frozenset(none_of)
+
+
+# Видимые блоки страницы (таблицы, dt/dd, «Лейбл: значение»)
+VISIBLE_RULES: t.Tuple[Rule, ...] = (
+    _rule("rooms", {"комнат", "rooms"}),
+    _rule("total_area_m2", {"общая площадь", "площадь", "area"}),
+    _rule("living_area_m2", {"жилая площадь", "living area"}),
+    _rule("kitchen_area_m2", {"площадь кухни", "kitchen area"}),
+    _rule("floor", {"этаж"}, none_of={"этажност"}),
+    _rule("floors_total", {"этажност", "всего этажей", "floors"}),
+    _rule("year_built", {"год постройки", "year built"}),
+    _rule("address", {"адрес", "address"}),
+    _rule("price", {"цена", "price"}),
+)
+
+# additionalProperty из JSON-LD
+JSONLD_RULES: t.Tuple[Rule, ...] = (
+    _rule("rooms", {"комнат", "rooms"}),
+    _rule("living_area_m2", {"площад", "area"}, {"жила", "living"}),
+    _rule("kitchen_area_m2", {"площад", "area"}, {"кухн", "kitchen"},
+          none_of={"жила", "living"}),
+    _rule("total_area_m2", {"площад", "area"},
+          none_of={"жила", "living", "кухн", "kitchen"}),
+    _rule("floor", {"этаж"}, none_of={"этажност"}),
+    _rule("floors_total", {"этажност", "floors"}),
+    _rule("year_built", {"год"}, {"построй"}),
+)
+
+RULESETS: t.Dict[str, t.Tuple[Rule, ...]] = {
+    "visible": VISIBLE_RULES,
+    "jsonld": JSONLD_RULES,
+}
+
+
+def _atoms(rules: t.Iterable[Rule]) -> t.Set[str]:
+    out: t.Set[str] = set()
+    for _, groups, none_of in rules:
+        for g in groups:
+            out |= g
+        out |= none_of
+    return out
+
+
+_ATOMS = sorted(_atoms(VISIBLE_RULES) | _atoms(JSONLD_RULES), key=len, reverse=True)
+# Длинные варианты первыми: в одной позиции выигрывает самый длинный атом,
+# а короткие, что в нём содержатся, добавляем через _IMPLIED.
+_MATCHER = re.compile("(?=(" + "|".join(re.escape(a) for a in _ATOMS) + "))")
+_IMPLIED: t.Dict[str, t.FrozenSet[str]] = {
+    a: frozenset(b for b in _ATOMS if b in a) for a in _ATOMS
+}
+
+_WS_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def normalize_label(label: str) -> str:
+    return _WS_RE.sub(" ", label).strip().lower()
+
+
+def label_atoms(label: str) -> t.FrozenSet[str]:
+    """Все ключевые подстроки, которые встречаются в (нормализованном) лейбле."""
+    hits: t.Set[str] = set()
+    for m in _MATCHER.finditer(label):
+        hits |= _IMPLIED[m.group(1)]
+    return frozenset(hits)
+
+
+@lru_cache(maxsize=8192)
+def classify_label(label: str, ruleset: str = "visible") -> t.Tuple[str, ...]:
+    """
+    Сырой лейбл -> кортеж полей, которые он описывает (в порядке правил).
+    Пустой кортеж — лейбл нам не интересен.
+    """
+    hits = label_atoms(normalize_label(label))
+    if not hits:
+        return ()
+    return tuple(
+        field for field, groups, none_of in RULESETS[ruleset]
+        if all(g & hits for g in groups) and not none_of & hits
+    )
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+recrawl.py
+Инкрементальный перекраул сохранённых объявлений.
+
+Вместо полного обхода тратим ограниченный бюджет запросов в час на те
+объявления, которые вероятнее всего устарели:
+
+    λ        = (change_count + 0.5) / (часов под наблюдением + 24)   — изменений в час
+    p_stale  = 1 - exp(-λ · часов с последней проверки)
+    priority = p_stale · (1 + ln(1 + view_count))
+
+Априорные 0.5 изменения за первые сутки не дают новым объявлениям
+получить нулевой приоритет, пока истории ещё нет.
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import math
+import typing as t
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from ..models import FetchLog, Listing
+from .ingest import upsert_listing
+
+log = logging.getLogger(__name__)
+
+# robots.txt + сама страница (robots кэшируется в http_client, но считаем с запасом)
+REQUESTS_PER_LISTING = 2
+PRIOR_CHANGES = 0.5
+PRIOR_HOURS = 24.0
+AD_URL_PREFIXES = ("https://krisha.kz/a/show/", "https://www.krisha.kz/a/show/")
+
+
+class RequestBudget:
+    """
+    Скользящее окно: не больше per_hour запросов за последние 3600 с.
+
+    Потраченные запросы — строки FetchLog, их пишет record_fetch на каждый
+    запрос к источнику через http_client (recrawl, IngestView,
+    discover_listings --ingest, ...), так что бюджет общий для всех
+    процессов, а не для одного цикла recrawl. Строки старше окна удаляет
+    prune() — раз за проход recrawl, а не на каждый запрос.
+    """
+
+    WINDOW = timedelta(hours=1)
+
+    def __init__(self, per_hour: int, clock: t.Callable[[], datetime] = timezone.now):
+        self.per_hour = per_hour
+        self.clock = clock
+
+    def _window(self):
+        return FetchLog.objects.filter(at__gt=self.clock() - self.WINDOW)
+
+    def prune(self) -> int:
+        return FetchLog.objects.filter(at__lte=self.clock() - self.WINDOW).delete()[0]
+
+    def available(self) -> int:
+        return max(0, self.per_hour - self._window().count())
+
+    def consume(self, n: int = 1, host: str = "") -> None:
+        now = self.clock()
+        FetchLog.objects.bulk_create([FetchLog(host=host, at=now) for _ in range(n)])
+
+    def seconds_until_available(self, n: int = 1) -> float:
+        """Сколько ждать, пока освободится n запросов."""
+        if n > self.per_hour:
+            raise ValueError(f"{n} requests never fit into a budget of {self.per_hour}/h")
+        spent = self._window().order_by('at').values_list('at', flat=True)
+        overflow = spent.count() + n - self.per_hour
+        if overflow <= 0:
+            return 0.0
+        oldest = spent[overflow - 1]
+        return max(0.0, (oldest + self.WINDOW - self.clock()).total_seconds())
+
+
+def record_fetch(host: str) -> None:
+    """Хук http_client.fetch_hooks: учесть исходящий запрос в общем бюджете."""
+    FetchLog.objects.create(host=host, at=timezone.now())
+
+
+def priority(now: datetime, created_at: datetime, updated_at: datetime,
+             last_checked_at: t.Optional[datetime], change_count: int,
+             view_count: int) -> float:
+    checked = last_checked_at or updated_at
+    age_h = max(0.0, (now - checked).total_seconds() / 3600)
+    tracked_h = max(0.0, (now - created_at).total_seconds() / 3600)
+    rate = (change_count + PRIOR_CHANGES) / (tracked_h + PRIOR_HOURS)
+    p_stale = 1.0 - math.exp(-rate * age_h)
+    return p_stale * (1.0 + math.log1p(view_count))
+
+
+@dataclass(order=True)
+class Candidate:
+    score: float
+    id: int = field(compare=False)
+    source_url: str = field(compare=False)
+
+
+def pick_due(limit: int, now: t.Optional[datetime] = None,
+             min_age: timedelta = timedelta(hours=1)) -> t.List[Candidate]:
+    """
+    Top-N по приоритету. Читаем только нужные колонки потоком и держим
+    кучу размера limit — память O(limit), а не O(числа объявлений).
+    """
+    if limit <= 0:
+        return []
+    now = now or timezone.now()
+    cutoff = now - min_age
+    rows = (
+        Listing.objects
+        .filter(Q(last_checked_at__lt=cutoff) |
+                Q(last_checked_at__isnull=True, updated_at__lt=cutoff))
+        # ходим только на krisha.kz, даже если в БД попал чужой URL
+        .filter(Q(source_url__startswith=AD_URL_PREFIXES[0]) |
+                Q(source_url__startswith=AD_URL_PREFIXES[1]))
+        .values_list('id', 'source_url', 'created_at', 'updated_at',
+                     'last_checked_at', 'change_count', 'view_count')
+        .iterator(chunk_size=2000)
+    )
+    scored = (
+        Candidate(priority(now, created, updated, checked, changes, views), pk, url)
+        for pk, url, created, updated, checked, changes, views in rows
+    )
+    return heapq.nlargest(limit, scored)
+
+
+def recrawl_once(budget: RequestBudget,
+                 scrape: t.Optional[t.Callable[[str], t.Dict]] = None,
+                 min_age: timedelta = timedelta(hours=1),
+                 dry_run: bool = False) -> t.Dict[str, int]:
+    """Один проход: тратим столько, сколько позволяет бюджет прямо сейчас."""
+    if scrape is None:
+        from .scraper import scrape_listing as scrape
+
+    stats = {"picked": 0, "changed": 0, "unchanged": 0, "failed": 0}
+    budget.prune()
+    due = pick_due(budget.available() // REQUESTS_PER_LISTING, min_age=min_age)
+    stats["picked"] = len(due)
+    for cand in due:
+        if dry_run:
+            log.info("recrawl %.3f %s", cand.score, cand.source_url)
+            continue
+        # сами запросы учитывает http_client.get
+        try:
+            data = scrape(cand.source_url)
+        except Exception as e:
+            stats["failed"] += 1
+            log.warning("recrawl failed for %s: %s", cand.source_url, e)
+            # всё равно отмечаем проверку, иначе битая ссылка навсегда во главе очереди
+            Listing.objects.filter(pk=cand.id).update(last_checked_at=timezone.now())
+            continue
+        # снимок истории пишется в той же транзакции, что и само объявление
+        _, _, changed = upsert_listing(cand.source_url, data)
+        stats["changed" if changed else "unchanged"] += 1
+    return stats
+
+
+def default_budget() -> RequestBudget:
+    return RequestBudget(getattr(settings, "RECRAWL_BUDGET_PER_HOUR", 300))
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+replay.py
+Запись/воспроизведение HTTP для нагрузочного тестирования без krisha.kz.
+
+Транспорт-адаптеры requests монтируются в общую сессию http_client, так что
+скрейперы, прокси фото и discovery ничего не знают о подмене.
+
+Переменные окружения (читаются при создании сессии):
+    KRISHA_HTTP_MODE=record|replay     — режим; без него ходим в сеть как обычно
+    KRISHA_REPLAY_DIR=var/replay       — где лежат записанные ответы
+    KRISHA_REPLAY_LATENCY_MS=80        — средняя задержка ответа
+    KRISHA_REPLAY_JITTER_MS=40         — разброс задержки (равномерно ±)
+    KRISHA_REPLAY_ERROR_RATE=0.01      — доля обрывов соединения
+    KRISHA_REPLAY_429_RATE=0.02        — доля ответов 429 Too Many Requests
+    KRISHA_REPLAY_SYNTHETIC=1          — нет записи -> сгенерировать страницу
+    KRISHA_REPLAY_KEEP_DELAY=1         — не отключать паузы лимитера в replay
+
+Формат записи: <key>.json (url, status, headers) + <key>.body, key = sha1(METHOD url).
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import typing as t
+from pathlib import Path
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+_AD_RE = re.compile(r"/a/show/(\d+)")
+# Content-Encoding не храним: requests уже распаковал тело
+_SAVED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Cache-Control", "Retry-After")
+
+
+def record_key(method: str, url: str) -> str:
+    return hashlib.sha1(f"{method.upper()} {url}".encode("utf-8")).hexdigest()
+
+
+class _Store:
+    def __init__(self, root: t.Union[str, Path]):
+        self.root = Path(root)
+
+    def load(self, method: str, url: str) -> t.Optional[t.Tuple[dict, bytes]]:
+        key = record_key(method, url)
+        meta_path = self.root / f"{key}.json"
+        if not meta_path.exists():
+            return None
+        meta = json.loads(meta_path.read_text("utf-8"))
+        return meta, (self.root / f"{key}.body").read_bytes()
+
+    def save(self, method: str, url: str, status: int, headers: t.Mapping, body: bytes) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        key = record_key(method, url)
+        (self.root / f"{key}.body").write_bytes(body)
+        meta = {"url": url, "status": status,
+                "headers": {h: headers[h] for h in _SAVED_HEADERS if h in headers}}
+        (self.root / f"{key}.json").write_text(json.dumps(meta, ensure_ascii=False), "utf-8")
+
+
+def _build_response(request, status: int, headers: t.Mapping, body: bytes) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = status
+    resp.headers = CaseInsensitiveDict(headers)
+    resp._content = body
+    resp._content_consumed = True  # иначе iter_content полезет в несуществующий raw
+    resp.url = request.url
+    resp.request = request
+    resp.reason = {200: "OK", 404: "Not Found", 429: "Too Many Requests"}.get(status, "")
+    resp.encoding = requests.utils.get_encoding_from_headers(resp.headers) or "utf-8"
+    return resp
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Обычный транспорт, который дополнительно сохраняет каждый ответ."""
+
+    def __init__(self, root: t.Union[str, Path], **kwargs):
+        super().__init__(**kwargs)
+        self.store = _Store(root)
+
+    def send(self, request, **kwargs):
+        kwargs["stream"] = False  # тело нужно целиком, чтобы его сохранить
+        resp = super().send(request, **kwargs)
+        self.store.save(request.method, request.url, resp.status_code, resp.headers, resp.content)
+        return resp
+
+
+class ReplayAdapter(BaseAdapter):
+    """Отдаёт записанные ответы с настраиваемой задержкой и сбоями."""
+
+    def __init__(self, root: t.Union[str, Path], latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 rate_429: float = 0.0, synthetic: bool = False,
+                 seed: t.Optional[int] = None):
+        super().__init__()
+        self.store = _Store(root)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_429 = rate_429
+        self.synthetic = synthetic
+        self._rnd = random.Random(seed)
+        self._rnd_lock = threading.Lock()
+
+    def _roll(self) -> t.Tuple[float, float]:
+        with self._rnd_lock:
+            return self._rnd.random(), self._rnd.uniform(-1.0, 1.0)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        roll, jitter = self._roll()
+        delay = max(0.0, self.latency_ms + jitter * self.jitter_ms) / 1000
+        if delay:
+            time.sleep(delay)
+
+        if roll < self.error_rate:
+            raise requests.ConnectionError(f"replay: simulated connection error for {request.url}")
+        if roll < self.error_rate + self.rate_429:
+            return _build_response(request, 429, {"Retry-After": "1"}, b"")
+
+        hit = self.store.load(request.method, request.url)
+        if hit is not None:
+            meta, body = hit
+            return _build_response(request, meta["status"], meta.get("headers", {}), body)
+        if request.url.endswith("/robots.txt"):
+            return _build_response(request, 200, {"Content-Type": "text/plain"},
+                                   b"User-agent: *\nAllow: /\n")
+        if self.synthetic:
+            return synthetic_response(request)
+        return _build_response(request, 404, {"Content-Type": "text/plain"}, b"not recorded")
+
+    def close(self):
+        pass
+
+
+# ----------------------------- Синтетика -----------------------------
+
+# 1x1 WebP, чтобы прокси фото было что ресайзить
+_PIXEL_WEBP = base64.b64decode("UklGRhoAAABXRUJQVlA4TA0AAAAvAAAAEAcQERGIiP4HAA==")
+
+
+def synthetic_page(ad_id: int) -> str:
+    """Правдоподобная страница объявления: JSON-LD, таблица пар, фото."""
+    rnd = random.Random(ad_id)
+    rooms = rnd.randint(1, 5)
+    area = rnd.randint(25, 180)
+    price = rnd.randint(15, 150) * 1_000_000
+    photos = [
+        f"https://krisha-photos.kcdn.online/webp/{ad_id % 97:02x}/{ad_id}/{i}-{size}.webp"
+        for i in range(1, rnd.randint(4, 12))
+        for size in ("120x90", "400x300", "750x470")
+    ]
+    ld = {
+        "@context": "https://schema.org", "@type": "Product",
+        "name": f"{rooms}-комнатная квартира, {area} м²",
+        "description": "Продаётся квартира. " * rnd.randint(10, 60),
+        "image": photos[::3],
+        "offers": {"@type": "Offer", "price": price, "priceCurrency": "KZT"},
+    }
+    rows = "".join(
+        f"<tr><td>{k}</td><td>{v}</td></tr>"
+        for k, v in (("Количество комнат", rooms), ("Общая площадь", f"{area} м²"),
+                     ("Этаж", f"{rnd.randint(1, 9)} из 9"), ("Год постройки", rnd.randint(1960, 2024)),
+                     ("Адрес", f"Алматы, ул. Абая {rnd.randint(1, 200)}"))
+    )
+    imgs = "".join(f'<img src="{u}">' for u in photos)
+    return (
+        "<html><head>"
+        f'<script type="application/ld+json">{json.dumps(ld, ensure_ascii=False)}</script>'
+        f'<meta property="og:title" content="{ld["name"]}">'
+        f"</head><body><h1>{ld['name']}</h1><table>{rows}</table>{imgs}</body></html>"
+    )
+
+
+def synthetic_response(request) -> requests.Response:
+    m = _AD_RE.search(request.url)
+    if m:
+        body = synthetic_page(int(m.group(1))).encode("utf-8")
+        return _build_response(request, 200, {"Content-Type": "text/html; charset=utf-8"}, body)
+    if "krisha-photos.kcdn.online" in request.url:
+        return _build_response(request, 200, {"Content-Type": "image/webp"}, _PIXEL_WEBP)
+    return _build_response(request, 404, {"Content-Type": "text/plain"}, b"not recorded")
+
+
+# ----------------------------- Подключение -----------------------------
+
+def adapter_from_env(env: t.Mapping[str, str] = os.environ) -> t.Optional[BaseAdapter]:
+    mode = env.get("KRISHA_HTTP_MODE", "").lower()
+    if mode not in ("record", "replay"):
+        return None
+    root = env.get("KRISHA_REPLAY_DIR", "var/replay")
+    if mode == "record":
+        return RecordingAdapter(root)
+    return ReplayAdapter(
+        root,
+        latency_ms=float(env.get("KRISHA_REPLAY_LATENCY_MS", "0")),
+        jitter_ms=float(env.get("KRISHA_REPLAY_JITTER_MS", "0")),
+        error_rate=float(env.get("KRISHA_REPLAY_ERROR_RATE", "0")),
+        rate_429=float(env.get("KRISHA_REPLAY_429_RATE", "0")),
+        synthetic=env.get("KRISHA_REPLAY_SYNTHETIC") == "1",
+    )
@@ -4,45 +4,44 @@ scraper.py
 Минимальный, но устойчивый парсер страницы объявления krisha.kz.
 Стратегия: robots.txt -> HTML -> JSON-LD -> OpenGraph -> видимые поля -> изображения.
 
-Использование:
-    python scraper.py "https://krisha.kz/a/show/XXXXXXX"
+Использование (из backend/roomify):
+    python -m listings.services.scraper "https://krisha.kz/a/show/XXXXXXX"
 """
 
 import re
 import json
-import time
 import sys
 import typing as t
 from dataclasses import dataclass, asdict
-from urllib.parse import urlparse, urljoin
+from functools import lru_cache
 
-import requests
 from bs4 import BeautifulSoup
-import urllib.robotparser as robotparser
 
 from typing import Dict
 
-def scrape_listing(url: str) -> Dict:
+from .http_client import HEADERS, REQUEST_TIMEOUT, RESPECT_DELAY_SEC, can_fetch, fetch_html  # noqa: F401
+from .extraction import ExtractionPlan, Stage, is_empty
+from .labels import classify_label
+from .images import accept_image_url, canonicalize_images
+
+def scrape_listing(url: str, fields: t.Optional[t.Iterable[str]] = None) -> Dict:
     """
     Точка входа для остального Django-кода.
     Возвращает обычный dict с ключами price, address, images и т.д.
+    fields — какие поля нужны вызывающему (None = все); лишние стадии не запускаются.
     """
-    listing = parse_krisha_listing(url)  # возвращает dataclass Listing
-    return listing.to_dict()
+    listing = parse_krisha_listing(url, fields=fields)  # возвращает dataclass Listing
+    return listing.to_dict(fields)
 
 
-# ----------------------------- Настройки -----------------------------
+def scrape(url: str, fields: t.Optional[t.Iterable[str]] = None) -> Dict:
+    """Короткий алиас: scrape(url, fields={"title", "images"})."""
+    return scrape_listing(url, fields=fields)
 
-HEADERS = {
-    "User-Agent": (
-        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
-        "(KHTML, like Gecko) Chrome/128.0 Safari/537.36"
-    ),
-    "Accept-Language": "ru,en;q=0.9",
-}
-REQUEST_TIMEOUT = 20  # секунд
-RESPECT_DELAY_SEC = 1.0  # пауза между запросами (вежливость)
 
+# ----------------------------- Настройки -----------------------------
+
+# HEADERS / таймауты / паузы живут в общем HTTP-слое (http_client.py)
 
 # ----------------------------- Модель результата -----------------------------
 
@@ -64,41 +63,21 @@ class Listing:
     year_built: t.Optional[str] = None
     description: t.Optional[str] = None
     images: t.List[str] = None
+    image_variants: t.List[dict] = None     # компактная карта размеров, см. images.py
 
-    def to_dict(self):
+    def to_dict(self, fields: t.Optional[t.Iterable[str]] = None):
         d = asdict(self)
+        if fields is not None:
+            keep = set(fields) | {"url"}
+            if "images" in keep:
+                keep.add("image_variants")
+            d = {k: v for k, v in d.items() if k in keep}
         # очистить пустые поля для красоты
         return {k: v for k, v in d.items() if v not in (None, [], "", {})}
 
 
 # ----------------------------- Вспомогательные -----------------------------
 
-def can_fetch(url: str) -> bool:
-    """Проверка robots.txt: можно ли ходить по этому URL."""
-    parsed = urlparse(url)
-    base = f"{parsed.scheme}://{parsed.netloc}"
-    robots_url = urljoin(base, "/robots.txt")
-    rp = robotparser.RobotFileParser()
-    try:
-        resp = requests.get(robots_url, headers=HEADERS, timeout=REQUEST_TIMEOUT)
-        if resp.status_code >= 400:
-            # Если robots.txt недоступен — трактуем аккуратно, но даём пройти (обычная практика),
-            # либо верните False, если хотите быть максимально строгим.
-            return True
-        rp.parse(resp.text.splitlines())
-        return rp.can_fetch(HEADERS["User-Agent"], url)
-    except requests.RequestException:
-        # В случае сетевой ошибки — по умолчанию разрешаем (или смените на False).
-        return True
-
-
-def fetch_html(url: str) -> str:
-    time.sleep(RESPECT_DELAY_SEC)
-    resp = requests.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT)
-    resp.raise_for_status()
-    return resp.text
-
-
 def find_all_json_ld(soup: BeautifulSoup) -> t.List[dict]:
     data = []
     for tag in soup.find_all("script", type=lambda v: v and "ld+json" in v):
@@ -125,11 +104,23 @@ def _first(*vals):
     return None
 
 
+_NUM_RE = re.compile(r"(\d+[.,]?\d*)")
+_NO_SPACES = str.maketrans("", "", "\u00A0 ")
+_WS_RE = re.compile(r"\s+")
+_LABEL_TEXT_RE = re.compile(r".+:\s*")
+_CACHEABLE_LEN = 256  # длинные тексты (описания) не кэшируем
+
+
 def _to_float(s: t.Optional[str]) -> t.Optional[float]:
     if not s:
         return None
+    return _parse_float(str(s))
+
+
+@lru_cache(maxsize=4096)
+def _parse_float(s: str) -> t.Optional[float]:
     # заменить запятую на точку и вытащить число
-    m = re.search(r"(\d+[.,]?\d*)", str(s).replace("\u00A0", " ").replace(" ", ""))
+    m = _NUM_RE.search(s.translate(_NO_SPACES))
     if not m:
         return None
     try:
@@ -139,7 +130,34 @@ def _to_float(s: t.Optional[str]) -> t.Optional[float]:
 
 
 def _clean_text(s: str) -> str:
-    return re.sub(r"\s+", " ", s or "").strip()
+    if s and len(s) <= _CACHEABLE_LEN:
+        return _clean_short(s)
+    return _WS_RE.sub(" ", s or "").strip()
+
+
+@lru_cache(maxsize=8192)
+def _clean_short(s: str) -> str:
+    return _WS_RE.sub(" ", s).strip()
+
+
+# Поля, значения которых приводим к числу; остальные храним строкой.
+_FLOAT_FIELDS = frozenset({"total_area_m2", "living_area_m2", "kitchen_area_m2"})
+
+
+def apply_label_pairs(pairs: t.Iterable[t.Tuple[str, str]], listing: Listing,
+                      ruleset: str = "visible") -> None:
+    """
+    Раскладывает пары «лейбл : значение» по полям: первое непустое значение
+    выигрывает. Лейбл -> поля ищется в предкомпилированной таблице (labels.py).
+    """
+    for k, v in pairs:
+        fields = classify_label(k, ruleset)
+        if not fields:
+            continue
+        v = _clean_text(v)
+        for f in fields:
+            if not getattr(listing, f):
+                setattr(listing, f, _to_float(v) if f in _FLOAT_FIELDS else v)
 
 
 # ----------------------------- Парсеры уровней -----------------------------
@@ -206,29 +224,13 @@ def parse_from_jsonld(ld_list: t.List[dict], listing: Listing) -> None:
         # Площадь/комнаты иногда лежат в additionalProperty
         add_props = obj.get("additionalProperty") or obj.get("additionalProperties")
         if isinstance(add_props, list):
-            for p in add_props:
-                if not isinstance(p, dict):
-                    continue
-                name = _clean_text(str(p.get("name", ""))).lower()
-                val = _clean_text(str(p.get("value", "")))
-                if not name or not val:
-                    continue
-                if "комнат" in name or "rooms" in name:
-                    listing.rooms = _first(listing.rooms, val)
-                if "площад" in name or "area" in name:
-                    # пробуем распознать разные типы площадей
-                    if "жила" in name or "living" in name:
-                        listing.living_area_m2 = listing.living_area_m2 or _to_float(val)
-                    elif "кухн" in name or "kitchen" in name:
-                        listing.kitchen_area_m2 = listing.kitchen_area_m2 or _to_float(val)
-                    else:
-                        listing.total_area_m2 = listing.total_area_m2 or _to_float(val)
-                if "этаж" in name and "этажност" not in name:
-                    listing.floor = _first(listing.floor, val)
-                if "этажност" in name or "floors" in name:
-                    listing.floors_total = _first(listing.floors_total, val)
-                if "год" in name and "построй" in name:
-                    listing.year_built = _first(listing.year_built, val)
+            # площади различаем по типу: жилая / кухня / общая (см. JSONLD_RULES)
+            apply_label_pairs(
+                ((str(p.get("name", "")), str(p.get("value", "")))
+                 for p in add_props
+                 if isinstance(p, dict) and str(p.get("value", "")).strip()),
+                listing, ruleset="jsonld",
+            )
 
     # Дописываем изображения
     if images:
@@ -252,6 +254,12 @@ def parse_from_visible_blocks(soup: BeautifulSoup, listing: Listing) -> None:
     Хейуристики: ищем пары «лейбл : значение» в таблицах и списках,
     подтягиваем комнаты/площади/этажи/год.
     """
+    parse_visible_pairs(soup, listing)
+    parse_visible_headings(soup, listing)
+
+
+def parse_visible_pairs(soup: BeautifulSoup, listing: Listing) -> None:
+    """Самая дорогая часть эвристик: пары «лейбл : значение»."""
     pairs: list[tuple[str, str]] = []
 
     # 1) Таблицы <table>
@@ -268,7 +276,7 @@ def parse_from_visible_blocks(soup: BeautifulSoup, listing: Listing) -> None:
             pairs.append((dt.get_text(" ", strip=True), dd.get_text(" ", strip=True)))
 
     # 3) Элементы с двоеточием
-    for el in soup.find_all(text=re.compile(r".+:\s*")):
+    for el in soup.find_all(text=_LABEL_TEXT_RE):
         txt = _clean_text(str(el))
         if ":" in txt and len(txt) < 80:
             val = el.parent.get_text(" ", strip=True).replace(txt, "").strip()
@@ -277,37 +285,10 @@ def parse_from_visible_blocks(soup: BeautifulSoup, listing: Listing) -> None:
                 pairs.append((label, val))
 
     # нормализация и раскладывание по полям
-    for k, v in pairs:
-        lk = _clean_text(k).lower()
-        v = _clean_text(v)
+    apply_label_pairs(pairs, listing)
 
-        if not listing.rooms and ("комнат" in lk or "rooms" in lk):
-            listing.rooms = v
-
-        if ("общая площадь" in lk or "площадь" in lk or "area" in lk) and not listing.total_area_m2:
-            listing.total_area_m2 = _to_float(v)
-
-        if ("жилая площадь" in lk or "living area" in lk) and not listing.living_area_m2:
-            listing.living_area_m2 = _to_float(v)
-
-        if ("площадь кухни" in lk or "kitchen area" in lk) and not listing.kitchen_area_m2:
-            listing.kitchen_area_m2 = _to_float(v)
-
-        if ("этаж" in lk) and ("этажност" not in lk):
-            listing.floor = _first(listing.floor, v)
-
-        if ("этажност" in lk or "всего этажей" in lk or "floors" in lk):
-            listing.floors_total = _first(listing.floors_total, v)
-
-        if ("год постройки" in lk or "year built" in lk) and not listing.year_built:
-            listing.year_built = v
-
-        if ("адрес" in lk or "address" in lk) and not listing.address:
-            listing.address = v
-
-        if ("цена" in lk or "price" in lk) and not listing.price:
-            listing.price = v
 
+def parse_visible_headings(soup: BeautifulSoup, listing: Listing) -> None:
     # Заголовок/описание (если совсем пусто)
     if not listing.title:
         h1 = soup.find(["h1", "h2"])
@@ -336,53 +317,41 @@ def collect_more_images(soup: BeautifulSoup, listing: Listing) -> None:
     if ltag and accept_image_url(ltag.get("href", "")):
         imgs.append(ltag["href"])
 
-    listing.images = list(dict.fromkeys(imgs))[:30]
-
-KRISHA_IMG_HOSTS = {
-    "krisha-photos.kcdn.online",
-    # при желании добавьте другие допустимые хосты
-}
-
-KRISHA_ALLOWED_HOST = "krisha-photos.kcdn.online"
-
-def accept_image_url(u: str) -> bool:
-    """
-    Пропускаем только HTTPS-изображения строго с домена krisha-photos.kcdn.online,
-    исключая рекламные/контентные пути (/content/) и non-image ссылки.
-    """
-    if not u or not u.startswith("http"):
-        return False
-
-    pu = urlparse(u)
-
-    # 1) Только https
-    if pu.scheme != "https":
-        return False
+    # лимит в 30 считаем уже по уникальным фото, см. canonicalize_images
+    listing.images = list(dict.fromkeys(imgs))
 
-    # 2) Только нужный домен
-    if pu.netloc != KRISHA_ALLOWED_HOST:
-        return False
 
-    # 3) Отсекаем контентные/рекламные изображения
-    if pu.path.startswith("/content/"):
-        return False
-
-    # 4) Разрешаем только типичные корни фоток объявлений
-    allowed_roots = ("/webp/", "/photos/", "/images/", "/img/")
-    if not pu.path.startswith(allowed_roots):
-        return False
-
-    # 5) Должно быть изображение по расширению
-    allowed_ext = (".jpg", ".jpeg", ".png", ".webp", ".gif")
-    if not any(pu.path.lower().endswith(ext) for ext in allowed_ext):
-        return False
+# ----------------------------- Главная функция -----------------------------
 
-    return True
+# Порядок важен: каждая следующая стадия только дополняет пробелы.
+STAGES = (
+    # 1) JSON-LD (schema.org)
+    Stage("jsonld",
+          frozenset({"title", "description", "images", "price", "currency",
+                     "address", "latitude", "longitude", "rooms",
+                     "total_area_m2", "living_area_m2", "kitchen_area_m2",
+                     "floor", "floors_total", "year_built"}),
+          lambda soup, lst: parse_from_jsonld(find_all_json_ld(soup), lst)),
+    # 2) OpenGraph / twitter
+    Stage("opengraph",
+          frozenset({"title", "description", "images"}),
+          parse_from_opengraph),
+    # 3) Видимые блоки и таблицы (дополняем пробелы)
+    Stage("visible_pairs",
+          frozenset({"rooms", "total_area_m2", "living_area_m2", "kitchen_area_m2",
+                     "floor", "floors_total", "year_built", "address", "price"}),
+          parse_visible_pairs),
+    Stage("visible_headings",
+          frozenset({"title", "description"}),
+          parse_visible_headings),
+    # 4) Собираем больше фото
+    Stage("images", frozenset({"images"}), collect_more_images),
+)
 
 
-# ----------------------------- Главная функция -----------------------------
+def parse_krisha_listing(url: str, fields: t.Optional[t.Iterable[str]] = None) -> Listing:
+    plan = ExtractionPlan(STAGES, fields)  # ValueError на неизвестных полях — до сети
 
-def parse_krisha_listing(url: str) -> Listing:
     if not can_fetch(url):
         raise PermissionError("robots.txt запрещает доступ к этому URL")
 
@@ -391,17 +360,11 @@ def parse_krisha_listing(url: str) -> Listing:
 
     lst = Listing(url=url)
 
-    # 1) JSON-LD (schema.org)
-    parse_from_jsonld(find_all_json_ld(soup), lst)
-
-    # 2) OpenGraph / twitter
-    parse_from_opengraph(soup, lst)
+    plan.run(soup, lst, is_filled=lambda f: not is_empty(getattr(lst, f)))
 
-    # 3) Видимые блоки и таблицы (дополняем пробелы)
-    parse_from_visible_blocks(soup, lst)
-
-    # 4) Собираем больше фото
-    collect_more_images(soup, lst)
+    # Один URL на фото вместо всех размеров/форматов
+    if lst.images:
+        lst.images, lst.image_variants = canonicalize_images(lst.images)
 
     # Мини-нормализация «этаж/этажность», если только одно поле
     if lst.floor and not lst.floors_total:
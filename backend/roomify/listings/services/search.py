@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+search.py
+Полнотекстовый поиск по title / description / address.
+
+SQLite — FTS5-таблица listings_listing_fts (bm25 + snippet), Postgres —
+вычисляемая колонка search_vector с GIN (ts_rank_cd + ts_headline). Обе
+структуры создаёт миграция 0006 и поддерживает сама БД (триггеры /
+GENERATED), так что ingest ничего дополнительно не делает.
+
+SQLite-бэкенд Django пересоздаёт таблицу при большинстве AlterField/AddField
+и теряет триггеры; ensure_sqlite_triggers (post_migrate) возвращает их и
+перестраивает индекс.
+"""
+
+from __future__ import annotations
+
+import html
+import re
+import typing as t
+
+from django.db import connection, connections
+
+from ..models import Listing
+
+MAX_LIMIT = 50
+SNIPPET_TOKENS = 16
+# БД оборачивает совпадения служебными символами, а в <b> они превращаются
+# уже после html.escape — иначе разметка из текста объявления попала бы в ответ
+HIGHLIGHT = ("\x02", "\x03")
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_COLUMNS = ("id", "title", "address", "price", "currency", "source_url")
+
+# те же триггеры, что создала 0006 (у миграции своя замороженная копия)
+SQLITE_TRIGGERS = {
+    "listings_listing_fts_ai": """
+        CREATE TRIGGER listings_listing_fts_ai AFTER INSERT ON listings_listing BEGIN
+            INSERT INTO listings_listing_fts(rowid, title, description, address)
+            VALUES (new.id, new.title, new.description, new.address);
+        END
+    """,
+    "listings_listing_fts_ad": """
+        CREATE TRIGGER listings_listing_fts_ad AFTER DELETE ON listings_listing BEGIN
+            INSERT INTO listings_listing_fts(listings_listing_fts, rowid, title, description, address)
+            VALUES ('delete', old.id, old.title, old.description, old.address);
+        END
+    """,
+    "listings_listing_fts_au": """
+        CREATE TRIGGER listings_listing_fts_au AFTER UPDATE OF title, description, address
+        ON listings_listing
+        WHEN old.title IS NOT new.title OR old.description IS NOT new.description
+             OR old.address IS NOT new.address
+        BEGIN
+            INSERT INTO listings_listing_fts(listings_listing_fts, rowid, title, description, address)
+            VALUES ('delete', old.id, old.title, old.description, old.address);
+            INSERT INTO listings_listing_fts(rowid, title, description, address)
+            VALUES (new.id, new.title, new.description, new.address);
+        END
+    """,
+}
+
+
+def missing_sqlite_triggers(using: str = "default") -> t.List[str]:
+    """Триггеры FTS, которых нет в БД (пусто, если FTS-таблицы нет вовсе)."""
+    conn = connections[using]
+    if conn.vendor != "sqlite":
+        return []
+    with conn.cursor() as cur:
+        cur.execute("SELECT type, name FROM sqlite_master WHERE name LIKE %s",
+                    ["listings_listing_fts%"])
+        found = {(kind, name) for kind, name in cur.fetchall()}
+    if ("table", "listings_listing_fts") not in found:
+        return []  # миграция 0006 ещё не применена (или откатана)
+    return [name for name in SQLITE_TRIGGERS if ("trigger", name) not in found]
+
+
+def ensure_sqlite_triggers(using: str = "default", **kwargs) -> t.List[str]:
+    """
+    Обработчик post_migrate: пересоздаёт потерянные триггеры и перестраивает
+    индекс — пока их не было, изменения в listings_listing в него не попадали.
+    """
+    missing = missing_sqlite_triggers(using)
+    if missing:
+        with connections[using].cursor() as cur:
+            for name in missing:
+                cur.execute(SQLITE_TRIGGERS[name])
+            cur.execute("INSERT INTO listings_listing_fts(listings_listing_fts) VALUES ('rebuild')")
+    return missing
+
+
+def fts5_query(q: str) -> str:
+    """
+    Пользовательский ввод -> безопасный запрос FTS5: каждое слово в кавычках
+    (никакого синтаксиса NEAR/OR/column: от пользователя), все слова через AND,
+    последнее — префиксом, чтобы поиск работал «по мере набора».
+    """
+    words = _WORD_RE.findall(q.lower())
+    if not words:
+        return ""
+    parts = [f'"{w}"' for w in words]
+    parts[-1] += "*"
+    return " ".join(parts)
+
+
+def _rows(cursor) -> t.List[t.Dict]:
+    names = [c[0] for c in cursor.description]
+    rows = [dict(zip(names, row)) for row in cursor.fetchall()]
+    for r in rows:
+        r["snippet"] = (html.escape(r["snippet"] or "")
+                        .replace(HIGHLIGHT[0], "<b>").replace(HIGHLIGHT[1], "</b>"))
+    return rows
+
+
+def _search_sqlite(q: str, limit: int, offset: int) -> t.List[t.Dict]:
+    match = fts5_query(q)
+    if not match:
+        return []
+    # веса bm25 по колонкам: title, description, address
+    sql = f"""
+        SELECT l.id, l.title, l.address, l.price, l.currency, l.source_url,
+               bm25(listings_listing_fts, 10.0, 1.0, 4.0) AS rank,
+               snippet(listings_listing_fts, -1, %s, %s, '…', {SNIPPET_TOKENS}) AS snippet
+        FROM listings_listing_fts
+        JOIN listings_listing l ON l.id = listings_listing_fts.rowid
+        WHERE listings_listing_fts MATCH %s
+        ORDER BY rank
+        LIMIT %s OFFSET %s
+    """
+    with connection.cursor() as cur:
+        cur.execute(sql, [*HIGHLIGHT, match, limit, offset])
+        return _rows(cur)
+
+
+def _search_postgres(q: str, limit: int, offset: int) -> t.List[t.Dict]:
+    # ts_headline дорогой (перечитывает текст), поэтому считаем его только
+    # для строк текущей страницы — во внешнем запросе после LIMIT
+    sql = """
+        WITH query AS (SELECT websearch_to_tsquery('russian', %s) AS tsq),
+        hits AS (
+            SELECT l.id, l.title, l.address, l.price, l.currency, l.source_url,
+                   l.description, ts_rank_cd(l.search_vector, query.tsq) AS rank
+            FROM listings_listing l, query
+            WHERE l.search_vector @@ query.tsq
+            ORDER BY rank DESC
+            LIMIT %s OFFSET %s
+        )
+        SELECT hits.id, hits.title, hits.address, hits.price, hits.currency,
+               hits.source_url, hits.rank,
+               ts_headline('russian', hits.description, query.tsq, %s) AS snippet
+        FROM hits, query
+        ORDER BY hits.rank DESC
+    """
+    with connection.cursor() as cur:
+        options = (f"StartSel={HIGHLIGHT[0]}, StopSel={HIGHLIGHT[1]}, "
+                   f"MaxWords={SNIPPET_TOKENS}, MinWords=5")
+        cur.execute(sql, [q, limit, offset, options])
+        return _rows(cur)
+
+
+def _search_fallback(q: str, limit: int, offset: int) -> t.List[t.Dict]:
+    from django.db.models import Q
+
+    cond = Q()
+    for w in _WORD_RE.findall(q):
+        cond &= Q(title__icontains=w) | Q(address__icontains=w) | Q(description__icontains=w)
+    rows = Listing.objects.filter(cond).values(*_COLUMNS)[offset:offset + limit]
+    return [{**r, "rank": None, "snippet": ""} for r in rows]
+
+
+def search(q: str, limit: int = 20, offset: int = 0) -> t.List[t.Dict]:
+    q = (q or "").strip()
+    if not q:
+        return []
+    limit = max(1, min(limit, MAX_LIMIT))
+    offset = max(0, offset)
+    vendor = connection.vendor
+    if vendor == "sqlite":
+        return _search_sqlite(q, limit, offset)
+    if vendor == "postgresql":
+        return _search_postgres(q, limit, offset)
+    return _search_fallback(q, limit, offset)
@@ -0,0 +1,22 @@
+"""Общие фикстуры тестов listings."""
+
+from ..models import Listing
+
+TEXT = (
+    "Продаётся светлая двухкомнатная квартира в кирпичном доме рядом с парком, "
+    "школой и остановкой. Сделан свежий ремонт, заменены окна и трубы, кухня "
+    "оборудована встроенной техникой, во дворе охраняемая парковка и детская площадка."
+)
+OTHER_TEXT = (
+    "Сдаётся просторный офис на первом этаже бизнес-центра с отдельным входом, "
+    "витринными окнами и парковкой для клиентов. Подходит под магазин, салон или "
+    "аптеку, есть все коммуникации и охрана круглосуточно без выходных дней."
+)
+
+
+def make_listing(n, description=TEXT, **kw):
+    data = dict(title="2-комнатная квартира, 54 м²", description=description,
+                latitude=43.2389, longitude=76.8897, total_area_m2=54.0, rooms="2",
+                price="30 000 000", currency="KZT")
+    data.update(kw)
+    return Listing.objects.create(source_url=f"https://krisha.kz/a/show/{n}", **data)
@@ -0,0 +1,43 @@
+from django.test import TestCase
+
+from ..models import Listing
+from ..services import dedup
+from .helpers import OTHER_TEXT, make_listing
+
+
+class DedupTests(TestCase):
+    def duplicate_of(self, obj):
+        return Listing.objects.values_list('duplicate_of', flat=True).get(pk=obj.pk)
+
+    def test_same_apartment_joins_oldest_cluster(self):
+        a, b = make_listing(1), make_listing(2, price="31 000 000")
+        dedup.index_listing(a)
+        self.assertEqual(dedup.index_listing(b), a.pk)
+        self.assertEqual(self.duplicate_of(b), a.pk)
+        self.assertEqual([r['id'] for r in dedup.cluster_of(b.pk)], [a.pk, b.pk])
+
+    def test_different_rooms_or_price_do_not_match(self):
+        a = make_listing(1)
+        b = make_listing(2, rooms="3")
+        c = make_listing(3, price="45 000 000")
+        for obj in (a, b, c):
+            self.assertIsNone(dedup.index_listing(obj))
+
+    def test_short_text_is_not_indexed(self):
+        a, b = make_listing(1, description=""), make_listing(2, description="")
+        dedup.index_listing(a)
+        self.assertIsNone(dedup.index_listing(b))
+        self.assertIsNone(self.duplicate_of(b))
+
+    def test_members_regroup_when_root_changes(self):
+        a, b, c = make_listing(1), make_listing(2), make_listing(3)
+        for obj in (a, b, c):
+            dedup.index_listing(obj)
+        self.assertEqual({self.duplicate_of(b), self.duplicate_of(c)}, {a.pk})
+
+        a.description = OTHER_TEXT
+        a.save()
+        self.assertIsNone(dedup.index_listing(a))
+        self.assertIsNone(self.duplicate_of(a))
+        self.assertIsNone(self.duplicate_of(b))
+        self.assertEqual(self.duplicate_of(c), b.pk)
@@ -0,0 +1,62 @@
+import gzip
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from ..services import discovery
+from ..services.discovery import KnownIds, discover, extract_ids, only_new
+from .helpers import make_listing
+
+
+class KnownIdsTests(TestCase):
+    def test_membership_and_add(self):
+        known = KnownIds([5, 1, 3, 3])
+        self.assertEqual(len(known), 3)
+        self.assertTrue(all(i in known for i in (1, 3, 5)))
+        self.assertFalse(any(i in known for i in (0, 2, 4, 6)))
+        known.add(4)
+        self.assertIn(4, known)
+        self.assertEqual(len(known), 4)
+
+    def test_from_db(self):
+        make_listing(1000001)
+        make_listing(1000002)
+        known = KnownIds.from_db()
+        self.assertEqual(len(known), 2)
+        self.assertIn(1000002, known)
+
+
+class OnlyNewTests(SimpleTestCase):
+    def test_skips_known_and_repeated(self):
+        known = KnownIds([2, 4])
+        self.assertEqual(list(only_new([1, 2, 3, 1, 4, 5, 3], known)), [1, 3, 5])
+        self.assertIn(5, known)
+
+    def test_discover_is_lazy(self):
+        urls = iter(["https://krisha.kz/a/show/7", "https://krisha.kz/prodazha/",
+                     "https://krisha.kz/a/show/8?x=1", "https://krisha.kz/a/show/9"])
+        ids = discover([urls], known=KnownIds([8]))
+        self.assertEqual(next(ids), 7)
+        self.assertEqual(next(urls), "https://krisha.kz/prodazha/")  # дальше не читали
+        self.assertEqual(list(ids), [9])
+        self.assertEqual(list(extract_ids(["https://krisha.kz/a/show/12/"])), [12])
+
+
+class SitemapTests(SimpleTestCase):
+    XML = (b'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+           + b"".join(b"<url><loc>https://krisha.kz/a/show/%d</loc></url>" % i for i in range(3))
+           + b"</urlset>")
+
+    def iter_sitemap(self, body, max_bytes=discovery.SITEMAP_MAX_BYTES):
+        with mock.patch("listings.services.http_client.can_fetch", return_value=True), \
+                mock.patch("listings.services.http_client.fetch_bytes", return_value=(body, "")), \
+                mock.patch.object(discovery, "SITEMAP_MAX_BYTES", max_bytes):
+            return list(discovery.iter_sitemap("https://krisha.kz/sitemap.xml.gz"))
+
+    def test_gzip_sitemap(self):
+        self.assertEqual(self.iter_sitemap(gzip.compress(self.XML)),
+                         [f"https://krisha.kz/a/show/{i}" for i in range(3)])
+
+    def test_unpacked_size_is_capped(self):
+        with self.assertLogs("listings.services.discovery", "WARNING"):
+            self.assertEqual(self.iter_sitemap(gzip.compress(self.XML), max_bytes=100), [])
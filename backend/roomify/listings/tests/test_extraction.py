@@ -0,0 +1,56 @@
+from django.test import SimpleTestCase
+
+from ..services.extraction import LISTING_FIELDS, ExtractionPlan, Stage, normalize_fields
+
+
+def make_stages():
+    """Стадии, которые пишут в out свои поля (значение — имя стадии)."""
+    def stage(name, *provides):
+        def run(out):
+            for f in provides:
+                if f == "images":
+                    out.setdefault(f, []).append(name)
+                else:
+                    out.setdefault(f, name)
+        return Stage(name, frozenset(provides), run)
+
+    return [
+        stage("jsonld", "title", "price", "images"),
+        stage("og", "title", "description", "images"),
+        stage("visible", "rooms", "floor"),
+        stage("img", "images"),
+    ]
+
+
+class ExtractionPlanTests(SimpleTestCase):
+    def run_plan(self, fields):
+        out = {}
+        plan = ExtractionPlan(make_stages(), fields=fields)
+        plan.run(out, is_filled=lambda f: f in out)
+        return plan, out
+
+    def test_stages_without_wanted_fields_are_skipped(self):
+        plan, out = self.run_plan({"rooms"})
+        self.assertEqual([s.name for s in plan.stages], ["visible"])
+        self.assertEqual(plan.executed, ["visible"])
+        self.assertEqual(out, {"rooms": "visible", "floor": "visible"})
+
+    def test_stops_once_single_fields_are_filled(self):
+        plan, out = self.run_plan({"title", "price", "description"})
+        self.assertEqual(plan.executed, ["jsonld", "og"])
+        self.assertEqual(out["title"], "jsonld")
+
+        plan, _ = self.run_plan({"title"})
+        self.assertEqual(plan.executed, ["jsonld"])
+
+    def test_accumulating_fields_run_every_stage(self):
+        plan, out = self.run_plan({"images"})
+        self.assertEqual(plan.executed, ["jsonld", "og", "img"])
+        self.assertEqual(out["images"], ["jsonld", "og", "img"])
+
+    def test_normalize_fields(self):
+        self.assertEqual(normalize_fields(None), LISTING_FIELDS)
+        self.assertEqual(normalize_fields(" title, images ,"), {"title", "images"})
+        self.assertEqual(normalize_fields(""), LISTING_FIELDS)
+        with self.assertRaises(ValueError):
+            normalize_fields("title,colour")
@@ -0,0 +1,71 @@
+from datetime import date, datetime, time, timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import ListingSnapshot, PriceRollup
+from ..services.history import rebuild_rollups
+from ..services.ingest import upsert_listing
+from .helpers import make_listing
+
+
+class UpsertListingTests(TestCase):
+    URL = "https://krisha.kz/a/show/100"
+    DATA = {"title": "1-комнатная квартира", "price": "20 000 000", "currency": "KZT",
+            "rooms": "1", "images": []}
+
+    def test_unchanged_refetch_bumps_counters_only(self):
+        obj, created, changed = upsert_listing(self.URL, dict(self.DATA))
+        self.assertTrue(created and changed)
+        updated_at = obj.updated_at
+
+        obj, created, changed = upsert_listing(self.URL, dict(self.DATA))
+        self.assertFalse(created or changed)
+        obj.refresh_from_db()
+        self.assertEqual((obj.fetch_count, obj.change_count), (2, 0))
+        self.assertEqual(obj.updated_at, updated_at)
+        self.assertEqual(ListingSnapshot.objects.filter(listing=obj).count(), 1)
+
+    def test_change_writes_snapshot(self):
+        upsert_listing(self.URL, dict(self.DATA))
+        obj, _, changed = upsert_listing(self.URL, {**self.DATA, "price": "19 500 000"})
+        self.assertTrue(changed)
+        obj.refresh_from_db()
+        self.assertEqual(obj.change_count, 1)
+        last = ListingSnapshot.objects.filter(listing=obj).latest('ts')
+        self.assertEqual(last.changes, {"price": "19 500 000"})
+        self.assertEqual(last.price_value, 19500000)
+
+
+class RollupTests(TestCase):
+    DAY = date(2026, 9, 1)
+
+    def at(self, day_offset):
+        day = self.DAY + timedelta(days=day_offset)
+        return timezone.make_aware(datetime.combine(day, time(12)))
+
+    def listing(self, n, prices, checked, currency="KZT"):
+        obj = make_listing(n, currency=currency, last_checked_at=self.at(checked))
+        ListingSnapshot.objects.bulk_create(
+            ListingSnapshot(listing=obj, ts=self.at(d), price_value=p) for d, p in prices)
+        return obj
+
+    def rollups(self, day_offset):
+        return set(PriceRollup.objects.filter(day=self.DAY + timedelta(days=day_offset))
+                   .values_list('rooms', 'currency', 'listings', 'median_price'))
+
+    def test_medians_per_currency_with_carry_forward(self):
+        self.listing(1, [(-100, 1), (0, 100), (10, 120)], checked=30)
+        self.listing(2, [(0, 200)], checked=30)
+        self.listing(3, [(-3, 300)], checked=30)
+        self.listing(4, [(-3, 7)], checked=30, currency="USD")
+        rebuild_rollups(self.DAY + timedelta(days=5), self.DAY + timedelta(days=12))
+        self.assertEqual(self.rollups(5), {(2, "KZT", 3, 200), (2, "USD", 1, 7)})
+        self.assertEqual(self.rollups(12), {(2, "KZT", 3, 200), (2, "USD", 1, 7)})
+
+    def test_stale_listing_drops_out(self):
+        self.listing(1, [(0, 100)], checked=30)
+        self.listing(2, [(0, 300)], checked=0)
+        rebuild_rollups(self.DAY + timedelta(days=1), self.DAY + timedelta(days=20))
+        self.assertEqual(self.rollups(1), {(2, "KZT", 2, 200)})
+        self.assertEqual(self.rollups(20), {(2, "KZT", 1, 100)})
@@ -0,0 +1,61 @@
+from django.test import TestCase
+
+from ..models import Listing
+from ..services.ingest import upsert_listing
+from .helpers import make_listing
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.obj, _, _ = upsert_listing("https://krisha.kz/a/show/200", {
+            "title": "Студия", "price": "15 000 000", "currency": "KZT", "rooms": "1"})
+
+    def assert_cached(self, path):
+        resp = self.client.get(path)
+        self.assertEqual(resp.status_code, 200)
+        tag = resp['ETag']
+        resp = self.client.get(path, HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['ETag'], tag)
+        return tag
+
+    def test_detail_etag_tracks_counters(self):
+        path = f"/api/listings/{self.obj.pk}"
+        tag = self.assert_cached(path)
+        Listing.objects.filter(pk=self.obj.pk).update(view_count=5)
+        self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=tag).status_code, 200)
+        # в узком наборе полей счётчика нет — версия та же
+        tag = self.assert_cached(f"{path}?fields=title")
+        Listing.objects.filter(pk=self.obj.pk).update(view_count=6)
+        resp = self.client.get(f"{path}?fields=title", HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(resp.status_code, 304)
+
+    def test_prices_etag_changes_with_new_price(self):
+        path = f"/api/listings/{self.obj.pk}/prices"
+        tag = self.assert_cached(path)
+        upsert_listing(self.obj.source_url, {"title": "Студия", "price": "14 000 000",
+                                             "currency": "KZT", "rooms": "1"})
+        resp = self.client.get(path, HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([p['price'] for p in resp.json()['prices']], [15000000, 14000000])
+
+    def test_missing_listing(self):
+        self.assertEqual(self.client.get("/api/listings/999999").status_code, 404)
+
+
+class CompressionTests(TestCase):
+    ACCEPT = "gzip, deflate, br"
+
+    def test_json_api_uses_brotli(self):
+        for n in range(5):
+            make_listing(n)
+        resp = self.client.get("/api/listings", HTTP_ACCEPT_ENCODING=self.ACCEPT)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Encoding'], "br")
+        self.assertIn("Accept-Encoding", resp['Vary'])
+
+    def test_html_falls_back_to_gzip(self):
+        # страница с csrfmiddlewaretoken: только gzip с паддингом против BREACH
+        resp = self.client.get("/admin/login/", HTTP_ACCEPT_ENCODING=self.ACCEPT)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Encoding'], "gzip")
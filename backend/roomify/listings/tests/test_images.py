@@ -0,0 +1,44 @@
+from importlib import import_module
+
+from django.test import SimpleTestCase
+
+from ..services.images import canonicalize_images
+from ..services.ingest import HASH_FIELDS
+
+
+class CanonicalizeImagesTests(SimpleTestCase):
+    CDN = "https://krisha-photos.kcdn.online"
+
+    def test_variants_grouped_per_photo(self):
+        urls = [
+            f"{self.CDN}/webp/0e/0e5d/1-750x470.webp",
+            f"{self.CDN}/photos/0e/0e5d/1-full.jpg",
+            f"{self.CDN}/webp/0e/0e5d/1-400x300.webp",
+            f"{self.CDN}/webp/0e/0e5d/2-750x470.webp",
+            "https://example.com/banner.png",
+        ]
+        images, variants = canonicalize_images(urls)
+        self.assertEqual(images, [f"{self.CDN}/photos/0e/0e5d/1-full.jpg",
+                                  f"{self.CDN}/webp/0e/0e5d/2-750x470.webp",
+                                  "https://example.com/banner.png"])
+        self.assertEqual(variants[0], {"id": "0e/0e5d/1", "d": "/photos/0e/0e5d/1-full.jpg",
+                                       "m": "/webp/0e/0e5d/1-400x300.webp"})
+        self.assertEqual(variants[1], {"id": "0e/0e5d/2", "d": "/webp/0e/0e5d/2-750x470.webp"})
+
+    def test_limit_counts_photos(self):
+        urls = [f"{self.CDN}/webp/ab/cd/{i}-{w}.webp" for i in range(5) for w in ("400x300", "750x470")]
+        images, _ = canonicalize_images(urls, limit=3)
+        self.assertEqual(len(images), 3)
+
+    def test_migration_copy_matches(self):
+        # 0004 держит замороженную копию канонизации и отпечатка. Разошлись — значит,
+        # формат сменился и нужна новая миграция данных (0004 не трогаем)
+        frozen = import_module("listings.migrations.0004_listing_image_variants")
+        urls = [f"{self.CDN}/{root}/ab/{i % 3}/{i}{size}.{ext}"
+                for i in range(40)
+                for root, ext in (("webp", "webp"), ("photos", "jpg"))
+                for size in ("-400x300", "-750x470", "-full", "")]
+        urls.append("https://example.com/x.png")
+        for n in (0, 1, 7, len(urls)):
+            self.assertEqual(frozen.canonicalize_images(urls[:n]), canonicalize_images(urls[:n]))
+        self.assertEqual(frozen.HASH_FIELDS, HASH_FIELDS)
@@ -0,0 +1,60 @@
+import os
+import tempfile
+
+from django.test import SimpleTestCase, TestCase
+
+from ..services import imgproxy
+from ..services.imgproxy import DiskLRU
+
+
+class DiskLRUTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+
+    def test_evicts_least_recently_used(self):
+        lru = DiskLRU(self.root, max_bytes=10)
+        lru.put("aa-1.webp", b"1234")
+        lru.put("bb-1.webp", b"1234")
+        self.assertIsNotNone(lru.get("aa-1.webp"))  # aa теперь свежее bb
+        lru.put("cc-1.webp", b"1234")
+        self.assertIsNone(lru.get("bb-1.webp"))
+        self.assertIsNotNone(lru.get("aa-1.webp"))
+        self.assertIsNotNone(lru.get("cc-1.webp"))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "bb", "bb-1.webp")))
+
+    def test_order_survives_restart(self):
+        lru = DiskLRU(self.root, max_bytes=100)
+        for i, name in enumerate(("aa-1.webp", "bb-1.webp", "cc-1.webp")):
+            path = lru.put(name, b"1234")
+            os.utime(path, (1000 + i, 1000 + i))
+        os.utime(lru.get("aa-1.webp"), (2000, 2000))  # как будто aa читали последним
+
+        lru = DiskLRU(self.root, max_bytes=10)
+        lru.put("dd-1.webp", b"1234")
+        self.assertIsNone(lru.get("bb-1.webp"))
+        self.assertIsNone(lru.get("cc-1.webp"))
+        self.assertIsNotNone(lru.get("aa-1.webp"))
+
+    def test_single_oversized_file_is_kept(self):
+        lru = DiskLRU(self.root, max_bytes=2)
+        lru.put("aa-1.webp", b"1234")
+        self.assertIsNotNone(lru.get("aa-1.webp"))
+
+
+class ImageProxyViewTests(TestCase):
+    URL = "https://krisha-photos.kcdn.online/webp/ab/1/1-750x470.webp"
+
+    def test_conditional_get(self):
+        key = imgproxy.register_images([self.URL])[self.URL]
+        tag = imgproxy.etag(key, 400)
+        resp = self.client.get(f"/api/img/{key}?w=400", HTTP_IF_NONE_MATCH=f'"other", {tag}')
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['ETag'], tag)
+
+    def test_unknown_key_is_404_even_with_etag(self):
+        key = imgproxy.image_key("https://krisha-photos.kcdn.online/never-registered.webp")
+        resp = self.client.get(f"/api/img/{key}?w=400",
+                               HTTP_IF_NONE_MATCH=imgproxy.etag(key, 400))
+        self.assertEqual(resp.status_code, 404)
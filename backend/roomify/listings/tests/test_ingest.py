@@ -0,0 +1,34 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from ..models import FetchLog, Listing
+from ..services.discovery import canonical_ad_url
+
+
+class CanonicalAdUrlTests(TestCase):
+    def test_accepts_krisha_ads_only(self):
+        self.assertEqual(canonical_ad_url(" https://www.krisha.kz/a/show/0123/?from=list "),
+                         "https://krisha.kz/a/show/123")
+        for url in ("http://krisha.kz/a/show/1", "https://krisha.kz.evil.com/a/show/1",
+                    "https://krisha.kz@169.254.169.254/a/show/1", "https://krisha.kz:8080/a/show/1",
+                    "http://169.254.169.254/a/show/1", "https://krisha.kz/a/show/1/../../admin",
+                    "https://krisha.kz/prodazha/", ""):
+            self.assertIsNone(canonical_ad_url(url), url)
+
+
+class IngestViewTests(TestCase):
+    def post(self, url):
+        return self.client.post("/api/ingest", {"url": url}, content_type="application/json")
+
+    def test_anonymous_rejected(self):
+        resp = self.post("https://krisha.kz/a/show/1")
+        self.assertIn(resp.status_code, (401, 403))
+        self.assertFalse(Listing.objects.exists())
+
+    def test_foreign_url_rejected_before_fetch(self):
+        User.objects.create_superuser("admin", password="pw")
+        self.client.login(username="admin", password="pw")
+        resp = self.post("http://169.254.169.254/a/show/1")
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(FetchLog.objects.exists())
+        self.assertFalse(Listing.objects.exists())
@@ -0,0 +1,35 @@
+from django.test import SimpleTestCase
+
+from ..services.labels import classify_label
+
+
+class ClassifyLabelTests(SimpleTestCase):
+    # прежняя цепочка `in`-проверок из scraper.py (видимые блоки)
+    LEGACY = {
+        "rooms": lambda lk: "комнат" in lk or "rooms" in lk,
+        "total_area_m2": lambda lk: "общая площадь" in lk or "площадь" in lk or "area" in lk,
+        "living_area_m2": lambda lk: "жилая площадь" in lk or "living area" in lk,
+        "kitchen_area_m2": lambda lk: "площадь кухни" in lk or "kitchen area" in lk,
+        "floor": lambda lk: "этаж" in lk and "этажност" not in lk,
+        "floors_total": lambda lk: "этажност" in lk or "всего этажей" in lk or "floors" in lk,
+        "year_built": lambda lk: "год постройки" in lk or "year built" in lk,
+        "address": lambda lk: "адрес" in lk or "address" in lk,
+        "price": lambda lk: "цена" in lk or "price" in lk,
+    }
+    LABELS = [
+        "Общая площадь", "Площадь, м²", "Жилая площадь", "Площадь кухни",
+        "Количество комнат", "Этаж", "Этаж из", "Этажность дома", "Всего этажей",
+        "Год постройки", "Адрес", "Цена", "Тип дома", "  Living   Area ", "Kitchen area",
+        "Floors", "Price per m²", "Жилой комплекс", "",
+    ]
+
+    def test_visible_rules_match_legacy_chain(self):
+        for label in self.LABELS:
+            lk = " ".join(label.split()).lower()
+            expected = tuple(f for f, pred in self.LEGACY.items() if pred(lk))
+            self.assertEqual(classify_label(label), expected, label)
+
+    def test_jsonld_area_split(self):
+        self.assertEqual(classify_label("Жилая площадь", "jsonld"), ("living_area_m2",))
+        self.assertEqual(classify_label("Площадь кухни", "jsonld"), ("kitchen_area_m2",))
+        self.assertEqual(classify_label("Общая площадь", "jsonld"), ("total_area_m2",))
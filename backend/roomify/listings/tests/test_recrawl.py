@@ -0,0 +1,90 @@
+import tempfile
+from datetime import timedelta
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import FetchLog, Listing
+from ..services import http_client
+from ..services.recrawl import RequestBudget, pick_due, record_fetch
+from ..services.replay import ReplayAdapter
+from .helpers import make_listing
+
+
+class FetchAccountingTests(TestCase):
+    PREFIX = "https://budget.test/"
+    CDN = "https://krisha-photos.kcdn.online/"
+
+    def setUp(self):
+        session = http_client.get_session()
+        empty = tempfile.TemporaryDirectory()
+        self.addCleanup(empty.cleanup)
+        for prefix in (self.PREFIX, self.CDN):
+            session.mount(prefix, ReplayAdapter(empty.name))
+            self.addCleanup(session.adapters.pop, prefix)
+
+    def test_hook_registered_by_app(self):
+        self.assertIn(record_fetch, http_client.fetch_hooks)
+
+    def test_get_records_source_fetches_only(self):
+        http_client.get(self.PREFIX + "a/show/1")
+        http_client.get(self.CDN + "webp/ab/1/1-400x300.webp")
+        self.assertEqual(list(FetchLog.objects.values_list('host', flat=True)), ["budget.test"])
+
+
+class RequestBudgetTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.budget = RequestBudget(3, clock=lambda: self.now)
+
+    def test_sliding_window(self):
+        start = self.now
+        self.budget.consume(2, host="krisha.kz")
+        self.now = start + timedelta(minutes=30)
+        self.budget.consume(1, host="krisha.kz")
+        self.assertEqual(self.budget.available(), 0)
+        self.assertEqual(self.budget.seconds_until_available(2), 1800)
+        self.assertEqual(self.budget.seconds_until_available(3), 3600)
+
+        self.now = start + timedelta(minutes=61)
+        self.assertEqual(self.budget.available(), 2)
+        self.assertEqual(self.budget.seconds_until_available(2), 0)
+        self.assertEqual(self.budget.prune(), 2)
+        self.assertEqual(FetchLog.objects.count(), 1)
+
+    def test_shared_between_instances(self):
+        RequestBudget(3).consume(2)
+        self.assertEqual(self.budget.available(), 1)
+
+    def test_request_larger_than_budget(self):
+        with self.assertRaises(ValueError):
+            RequestBudget(1).seconds_until_available(2)
+
+    def test_command_rejects_too_small_budget(self):
+        for budget in (0, 1):
+            with self.assertRaises(CommandError):
+                call_command('recrawl_listings', budget=budget, dry_run=True)
+
+
+class PickDueTests(TestCase):
+    def listing(self, n, checked_h, changes=0, views=0):
+        obj = make_listing(n)
+        Listing.objects.filter(pk=obj.pk).update(
+            created_at=self.now - timedelta(days=10),
+            last_checked_at=self.now - timedelta(hours=checked_h),
+            change_count=changes, view_count=views)
+        return obj.pk
+
+    def setUp(self):
+        self.now = timezone.now()
+
+    def test_orders_by_staleness_and_popularity(self):
+        quiet = self.listing(1, checked_h=10)
+        volatile = self.listing(2, checked_h=10, changes=5)
+        popular = self.listing(3, checked_h=10, views=100)
+        self.listing(4, checked_h=0.2, changes=50)  # проверено недавно — не берём
+        due = pick_due(10, now=self.now)
+        self.assertEqual([c.id for c in due], [volatile, popular, quiet])
+        self.assertEqual([c.id for c in pick_due(2, now=self.now)], [volatile, popular])
+        self.assertEqual(pick_due(0, now=self.now), [])
@@ -0,0 +1,66 @@
+import tempfile
+from collections import Counter
+
+import requests
+from django.test import SimpleTestCase
+
+from ..services.replay import ReplayAdapter, adapter_from_env
+
+
+class ReplayAdapterTests(SimpleTestCase):
+    AD = "https://krisha.kz/a/show/1000001"
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+
+    def session(self, adapter):
+        s = requests.Session()
+        s.mount("https://", adapter)
+        self.addCleanup(s.close)
+        return s
+
+    def outcomes(self, n, **kw):
+        # без записи и синтетики ответ — дешёвый 404, меряем только сбои;
+        # адаптер зовём напрямую, без накладных расходов Session
+        adapter = ReplayAdapter(self.root, seed=1, **kw)
+        req = requests.Request("GET", self.AD).prepare()
+        seen = Counter()
+        for _ in range(n):
+            try:
+                seen[adapter.send(req).status_code] += 1
+            except requests.ConnectionError:
+                seen["error"] += 1
+        return seen
+
+    def test_error_and_429_rates(self):
+        n = 4000
+        seen = self.outcomes(n, error_rate=0.05, rate_429=0.10)
+        self.assertAlmostEqual(seen["error"] / n, 0.05, delta=0.015)
+        self.assertAlmostEqual(seen[429] / n, 0.10, delta=0.02)
+        self.assertEqual(seen["error"] + seen[429] + seen[404], n)
+
+    def test_extreme_rates(self):
+        self.assertEqual(self.outcomes(20, error_rate=1.0), Counter({"error": 20}))
+        self.assertEqual(self.outcomes(20, rate_429=1.0), Counter({429: 20}))
+        self.assertEqual(self.outcomes(20), Counter({404: 20}))
+
+    def test_429_has_retry_after(self):
+        resp = self.session(ReplayAdapter(self.root, rate_429=1.0)).get(self.AD)
+        self.assertEqual(resp.headers["Retry-After"], "1")
+
+    def test_unrecorded_and_synthetic(self):
+        s = self.session(ReplayAdapter(self.root))
+        self.assertEqual(s.get(self.AD).status_code, 404)
+        resp = self.session(ReplayAdapter(self.root, synthetic=True)).get(self.AD)
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("application/ld+json", resp.text)
+        self.assertEqual(s.get("https://krisha.kz/robots.txt").status_code, 200)
+
+    def test_from_env(self):
+        self.assertIsNone(adapter_from_env({}))
+        adapter = adapter_from_env({"KRISHA_HTTP_MODE": "replay", "KRISHA_REPLAY_DIR": self.root,
+                                    "KRISHA_REPLAY_ERROR_RATE": "0.01",
+                                    "KRISHA_REPLAY_429_RATE": "0.02"})
+        self.assertEqual((adapter.error_rate, adapter.rate_429), (0.01, 0.02))
@@ -0,0 +1,51 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from ..models import Listing
+from ..services.search import SQLITE_TRIGGERS, ensure_sqlite_triggers, missing_sqlite_triggers, search
+from .helpers import make_listing
+
+
+class SearchIndexTests(TestCase):
+    def test_index_follows_update(self):
+        obj = make_listing(1, title="Квартира в ЖК Есентай")
+        self.assertEqual([r['id'] for r in search("Есентай")], [obj.pk])
+
+        obj.title = "Квартира в Медеу"
+        obj.save()
+        self.assertEqual(search("Есентай"), [])
+        self.assertEqual([r['id'] for r in search("Медеу")], [obj.pk])
+
+        obj.delete()
+        self.assertEqual(search("Медеу"), [])
+
+
+@skipUnless(connection.vendor == "sqlite", "FTS5-триггеры есть только на SQLite")
+class SqliteTriggerTests(TransactionTestCase):
+    def test_triggers_installed(self):
+        self.assertEqual(missing_sqlite_triggers(), [])
+
+    def test_table_rebuild_restores_triggers(self):
+        # AlterField на SQLite пересоздаёт таблицу — триггеры пропадают
+        old = Listing._meta.get_field("title")
+        new = old.clone()
+        new.set_attributes_from_name("title")
+        new.max_length = 300
+        with connection.schema_editor() as editor:
+            editor.alter_field(Listing, old, new)
+        try:
+            self.assertEqual(sorted(missing_sqlite_triggers()), sorted(SQLITE_TRIGGERS))
+            stale = make_listing(1, title="Квартира в ЖК Есентай")
+
+            self.assertEqual(sorted(ensure_sqlite_triggers()), sorted(SQLITE_TRIGGERS))
+            self.assertEqual(missing_sqlite_triggers(), [])
+            # rebuild подхватил строку, вставленную без триггеров, и новые тоже идут в индекс
+            self.assertEqual([r["id"] for r in search("Есентай")], [stale.pk])
+            fresh = make_listing(2, title="Квартира в Медеу")
+            self.assertEqual([r["id"] for r in search("Медеу")], [fresh.pk])
+        finally:
+            with connection.schema_editor() as editor:
+                editor.alter_field(Listing, new, old)
+            ensure_sqlite_triggers()
@@ -0,0 +1,39 @@
+import json
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+
+from .. import serializers
+from ..models import Listing
+from ..serializers import READ_FIELDS, ListingSerializer, dumps, listing_rows
+from .helpers import make_listing
+
+
+class FastPathTests(TestCase):
+    def setUp(self):
+        first = make_listing(1, images=["https://krisha-photos.kcdn.online/webp/ab/1/1-400x300.webp"],
+                             raw={"jsonld": {"name": "Квартира"}, "n": [1, 2.5, None]})
+        make_listing(2, duplicate_of=first, images=[], latitude=None)
+        Listing.objects.filter(pk=first.pk).update(view_count=7)
+        self.qs = Listing.objects.order_by('pk')
+
+    def drf(self, fields=READ_FIELDS):
+        data = JSONRenderer().render(ListingSerializer(self.qs, many=True).data)
+        return [{k: v for k, v in row.items() if k in fields} for row in json.loads(data)]
+
+    def fast(self, fields=READ_FIELDS):
+        return json.loads(dumps(listing_rows(self.qs, fields)))
+
+    def test_matches_listing_serializer(self):
+        self.assertEqual(self.fast(), self.drf())
+
+    def test_matches_without_orjson(self):
+        with mock.patch.object(serializers, 'orjson', None):
+            self.assertEqual(self.fast(), self.drf())
+
+    def test_sparse_fields_keep_model_order(self):
+        fields = {'price', 'title', 'id', 'images'}
+        rows = self.fast(fields)
+        self.assertEqual(rows, self.drf(fields))
+        self.assertEqual(list(rows[0]), ['id', 'title', 'price', 'images'])
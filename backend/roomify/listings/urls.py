@@ -1,6 +1,21 @@
+from django.conf import settings
 from django.urls import path
-from .views import IngestView, KrishaByIdView
+from .views import (IngestView, KrishaByIdView, ListingPriceHistoryView, MarketPricesView,
+                    ImageProxyView, ListingSearchView, ListingDuplicatesView,
+                    ListingListView, ListingDetailView)
 
-urlpatterns = [
+# эндпоинты, которые ходят на krisha.kz; воркер с SCRAPER_ENABLED=0 их не обслуживает
+scraper_urlpatterns = [
     path('krisha/<int:ad_id>',  KrishaByIdView.as_view(), name='krisha-by-id'),
+    path('ingest', IngestView.as_view(), name='ingest'),
+]
+
+urlpatterns = (scraper_urlpatterns if settings.SCRAPER_ENABLED else []) + [
+    path('listings', ListingListView.as_view(), name='listing-list'),
+    path('listings/<int:pk>', ListingDetailView.as_view(), name='listing-detail'),
+    path('listings/search', ListingSearchView.as_view(), name='listing-search'),
+    path('listings/<int:pk>/prices', ListingPriceHistoryView.as_view(), name='listing-prices'),
+    path('listings/<int:pk>/duplicates', ListingDuplicatesView.as_view(), name='listing-duplicates'),
+    path('market/prices', MarketPricesView.as_view(), name='market-prices'),
+    path('img/<slug:key>', ImageProxyView.as_view(), name='image-proxy'),
 ]
@@ -1,33 +1,108 @@
-import requests
+import hashlib
+import json
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import FileResponse, HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from rest_framework.authentication import BasicAuthentication, SessionAuthentication
+from rest_framework.permissions import IsAdminUser
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.db import transaction
-from .models import Listing
-from .serializers import ListingSerializer
-from .services.scraper import scrape_listing
-from .services.krisha_scraper import scrape_listing_by_id
+from django.db.models import Count, F, Max
+from .models import Listing, PriceRollup
+from .serializers import (DEFAULT_READ_FIELDS, READ_FIELDS, UNSAVED_FIELDS, ListingSerializer,
+                          dumps, listing_rows)
+from .services.extraction import BY_ID_FIELDS, normalize_fields
+from .services.ingest import upsert_listing
+from .services.history import price_timeline
+from .services import dedup, imgproxy
+from .services.discovery import canonical_ad_url
+from .services.search import search as search_listings, MAX_LIMIT
+
+
+class CacheHeadersMixin:
+    """
+    CACHE_CONTROL — политика кэширования эндпоинта; ставится на успешные
+    ответы и 304, если view не выставил свою. Ошибки не кэшируются.
+    """
+    CACHE_CONTROL = None
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if (self.CACHE_CONTROL and response.status_code < 400
+                and not response.has_header('Cache-Control')):
+            response['Cache-Control'] = self.CACHE_CONTROL
+        return response
+
+
+def not_modified(request, tag: str):
+    """304 (с тем же ETag), если у клиента актуальная версия, иначе None."""
+    resp = get_conditional_response(request, etag=tag)
+    if resp is not None:
+        resp['ETag'] = tag
+    return resp
+
+
+def content_etag(payload) -> str:
+    blob = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return f'"{hashlib.sha1(blob.encode("utf-8")).hexdigest()}"'
 
 
-class KrishaByIdView(APIView):
+class KrishaByIdView(CacheHeadersMixin, APIView):
     """
-    GET /api/krisha/<int:ad_id>
-    Возвращает JSON: {title, description, images[], url}
+    GET /api/krisha/<int:ad_id>[?fields=title,images]
+    Возвращает JSON: {title, description, images[], thumbs[], url}
+    images — по одному URL на фото, thumbs — уменьшенные варианты тех же фото.
+
+    ETag — хэш ответа. Последний ETag на KRISHA_BY_ID_MAX_AGE секунд
+    запоминается в кэше Django, так что повторный запрос с If-None-Match
+    получает 304 без скрейпа krisha.kz и без сериализации.
     """
     authentication_classes = []
     permission_classes = []
+    CACHE_CONTROL = f"public, max-age={settings.KRISHA_BY_ID_MAX_AGE}"
 
     def get(self, request, ad_id: int):
         try:
-            data = scrape_listing_by_id(ad_id)
+            fields = normalize_fields(request.query_params.get('fields'), BY_ID_FIELDS)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # ответ зависит от набора полей и (через URL прокси фото) от хоста
+        etag_key = "krisha-etag:%d:%s:%s:%d" % (
+            ad_id, ",".join(sorted(fields)), request.get_host(), settings.IMAGE_PROXY_ENABLED)
+        cached = cache.get(etag_key)
+        if cached is not None:
+            tag, url = cached
+            resp = not_modified(request, tag)
+            if resp is not None:
+                self._bump_views(url)
+                return resp
+
+        # скрейпер и requests грузим при первом запросе, а не при загрузке URLconf
+        import requests
+        from .services.krisha_scraper import scrape_listing_by_id
+        try:
+            data = scrape_listing_by_id(ad_id, fields=fields)
             # под ваш пример: только нужные ключи
-            out = {
-                "title": data.get("title") or "",
-                "description": data.get("description") or "",
-                "images": data.get("images") or [],
-                "url": data.get("url"),
-            }
-            return Response(out, status=status.HTTP_200_OK)
+            defaults = {"title": "", "description": "", "images": []}
+            out = {f: data.get(f) or defaults[f] for f in ('title', 'description', 'images')
+                   if f in fields}
+            if "images" in fields:
+                out["thumbs"] = data.get("thumbs") or []
+                if settings.IMAGE_PROXY_ENABLED:
+                    out["images"] = _proxied(request, out["images"], 1200)
+                    out["thumbs"] = _proxied(request, out["thumbs"], imgproxy.DEFAULT_WIDTH)
+            out["url"] = data.get("url")
+            self._bump_views(out["url"])
+            tag = content_etag(out)
+            cache.set(etag_key, (tag, out["url"]), settings.KRISHA_BY_ID_MAX_AGE)
+            resp = not_modified(request, tag) or Response(out, status=status.HTTP_200_OK)
+            resp['ETag'] = tag
+            return resp
         except PermissionError as e:
             return Response({"detail": str(e)}, status=status.HTTP_403_FORBIDDEN)
         except requests.HTTPError as e:
@@ -36,33 +111,252 @@ class KrishaByIdView(APIView):
         except Exception as e:
             return Response({"detail": f"scrape failed: {e}"}, status=status.HTTP_502_BAD_GATEWAY)
 
+    @staticmethod
+    def _bump_views(url: str) -> None:
+        # сигнал популярности для recrawl: чем чаще смотрят, тем раньше обновим
+        Listing.objects.filter(source_url=url).update(view_count=F('view_count') + 1)
+
+
+def _proxied(request, urls, width: int):
+    """Переписывает URL фото на /api/img/<key>?w=..., чтобы не ходить на CDN krisha."""
+    keys = imgproxy.register_images(urls)
+    return [
+        request.build_absolute_uri(reverse('image-proxy', args=[keys[u]])) + f"?w={width}"
+        for u in urls
+    ]
 
-class IngestView(APIView):
+
+class ImageProxyView(CacheHeadersMixin, APIView):
     """
-    POST /api/ingest { "url": "https://krisha.kz/a/show/..." }
+    GET /api/img/<key>?w=400
+    WebP-миниатюра фото из локального LRU-кэша (см. services/imgproxy.py).
     """
+    authentication_classes = []
+    permission_classes = []
+
+    CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+    def get(self, request, key: str):
+        try:
+            width = int(request.query_params.get('w', imgproxy.DEFAULT_WIDTH))
+        except ValueError:
+            width = 0
+        if width not in imgproxy.ALLOWED_WIDTHS:
+            return Response({"detail": f"w must be one of {imgproxy.ALLOWED_WIDTHS}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # 304 только для известных ключей: иначе любой key «существовал» бы
+        if not imgproxy.is_registered(key):
+            return Response({"detail": "not found"}, status=status.HTTP_404_NOT_FOUND)
+        tag = imgproxy.etag(key, width)
+        resp = not_modified(request, tag)
+        if resp is None:
+            try:
+                path = imgproxy.get_thumbnail(key, width)
+            except imgproxy.ImageNotFound:
+                return Response({"detail": "not found"}, status=status.HTTP_404_NOT_FOUND)
+            except PermissionError as e:
+                return Response({"detail": str(e)}, status=status.HTTP_403_FORBIDDEN)
+            except Exception as e:
+                return Response({"detail": f"image fetch failed: {e}"},
+                                status=status.HTTP_502_BAD_GATEWAY)
+            resp = FileResponse(open(path, 'rb'), content_type='image/webp')
+            resp['ETag'] = tag
+        return resp
+
+
+class IngestView(CacheHeadersMixin, APIView):
+    """
+    POST /api/ingest { "url": "https://krisha.kz/a/show/...", "fields": ["price", ...] }
+    fields необязателен: без него парсим и обновляем все поля.
+    Только для staff: запрос заставляет сервер ходить наружу и пишет в БД.
+    Принимаются только URL объявлений krisha.kz — иначе SSRF.
+    """
+    authentication_classes = [SessionAuthentication, BasicAuthentication]
+    permission_classes = [IsAdminUser]
+    CACHE_CONTROL = "no-store"
+
     def post(self, request):
-        url = (request.data.get('url') or '').strip()
-        if not url:
+        raw_url = request.data.get('url')
+        if not raw_url:
             return Response({"detail": "url is required"}, status=400)
+        url = canonical_ad_url(raw_url) if isinstance(raw_url, str) else None
+        if url is None:
+            return Response({"detail": "url must be https://krisha.kz/a/show/<id>"}, status=400)
+        try:
+            fields = normalize_fields(request.data.get('fields'))
+        except (ValueError, TypeError) as e:
+            return Response({"detail": str(e)}, status=400)
+        from .services.scraper import scrape_listing
         try:
-            data = scrape_listing(url)          # ← ТУТ ДЁРГАЕМ ТВОЙ СКРЕЙПЕР
+            data = scrape_listing(url, fields=fields)          # ← ТУТ ДЁРГАЕМ ТВОЙ СКРЕЙПЕР
         except Exception as e:
             return Response({"detail": f"scrape failed: {e}"}, status=502)
 
         # upsert по source_url
-        with transaction.atomic():
-            obj, created = Listing.objects.select_for_update().get_or_create(
-                source_url=url
-            )
-            # маппинг dict → поля модели
-            for f in ('title','price','currency','address','latitude','longitude',
-                      'rooms','total_area_m2','living_area_m2','kitchen_area_m2',
-                      'floor','floors_total','year_built','description','images'):
-                if f in data:
-                    setattr(obj, f, data[f])
-            obj.raw = data
-            obj.save()
+        obj, created, _ = upsert_listing(url, data, fields)
 
         return Response(ListingSerializer(obj).data,
                         status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+
+def _read_fields(request):
+    raw = request.query_params.get('fields')
+    return normalize_fields(raw, READ_FIELDS) if raw else DEFAULT_READ_FIELDS
+
+
+def _json(data, status_code: int = 200) -> HttpResponse:
+    # мимо рендерера DRF: тело уже готово (см. serializers.dumps)
+    return HttpResponse(dumps(data), status=status_code, content_type='application/json')
+
+
+class ListingListView(CacheHeadersMixin, APIView):
+    """
+    GET /api/listings?fields=id,title,price&limit=50&offset=0&unique=1
+    Список объявлений (новые первыми) через быстрый путь .values_list() + orjson.
+    Без fields — все поля, кроме raw. unique=1 — без повторных публикаций.
+    """
+    authentication_classes = []
+    permission_classes = []
+    CACHE_CONTROL = "public, max-age=60"
+    MAX_LIMIT = 500
+
+    def get(self, request):
+        try:
+            fields = _read_fields(request)
+            limit = min(int(request.query_params.get('limit', 50)), self.MAX_LIMIT)
+            offset = int(request.query_params.get('offset', 0))
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1 or offset < 0:
+            return Response({"detail": "limit must be >= 1 and offset >= 0"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        qs = Listing.objects.all()
+        if request.query_params.get('unique') == '1':
+            qs = qs.filter(duplicate_of__isnull=True)
+        return _json({"results": listing_rows(qs[offset:offset + limit], fields)})
+
+
+class ListingDetailView(CacheHeadersMixin, APIView):
+    """
+    GET /api/listings/<int:pk>?fields=title,price,images
+    Одно объявление; 304 отдаётся до чтения полей. ETag — updated_at плюс
+    значения запрошенных полей, которые меняются мимо save() (UNSAVED_FIELDS).
+    """
+    authentication_classes = []
+    permission_classes = []
+    CACHE_CONTROL = "public, max-age=60"
+
+    def get(self, request, pk: int):
+        try:
+            fields = _read_fields(request)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        volatile = sorted(UNSAVED_FIELDS.intersection(fields))
+        version = Listing.objects.filter(pk=pk).values_list('updated_at', *volatile).first()
+        if version is None:
+            return Response({"detail": "not found"}, status=status.HTTP_404_NOT_FOUND)
+        tag = content_etag([pk, version[0].timestamp(), *version[1:], sorted(fields)])
+        resp = not_modified(request, tag)
+        if resp is None:
+            rows = listing_rows(Listing.objects.filter(pk=pk), fields)
+            if not rows:  # удалили между двумя запросами
+                return Response({"detail": "not found"}, status=status.HTTP_404_NOT_FOUND)
+            resp = _json(rows[0])
+            resp['ETag'] = tag
+        return resp
+
+
+class ListingPriceHistoryView(CacheHeadersMixin, APIView):
+    """
+    GET /api/listings/<int:pk>/prices
+    Возвращает JSON: {id, currency, prices: [{ts, price}]} — только точки смены цены.
+    Новый снимок пишется только вместе с изменением объявления, поэтому ETag — updated_at.
+    """
+    authentication_classes = []
+    permission_classes = []
+    CACHE_CONTROL = "public, max-age=60"
+
+    def get(self, request, pk: int):
+        row = Listing.objects.filter(pk=pk).values_list('currency', 'updated_at').first()
+        if row is None:
+            return Response({"detail": "not found"}, status=status.HTTP_404_NOT_FOUND)
+        currency, updated_at = row
+        tag = f'"{pk}-{updated_at.timestamp():.6f}"'
+        resp = not_modified(request, tag)
+        if resp is None:
+            resp = Response({"id": pk, "currency": currency, "prices": price_timeline(pk)})
+            resp['ETag'] = tag
+        return resp
+
+
+class ListingDuplicatesView(CacheHeadersMixin, APIView):
+    """
+    GET /api/listings/<int:pk>/duplicates
+    Кластер повторных публикаций: {id, cluster: id самого старого, listings: [...]}
+    """
+    authentication_classes = []
+    permission_classes = []
+    CACHE_CONTROL = "public, max-age=300"
+
+    def get(self, request, pk: int):
+        members = dedup.cluster_of(pk)
+        if not members:
+            return Response({"detail": "not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"id": pk, "cluster": members[0]["id"], "listings": members})
+
+
+class ListingSearchView(CacheHeadersMixin, APIView):
+    """
+    GET /api/listings/search?q=двушка+абая&limit=20&offset=0
+    Полнотекстовый поиск по заголовку, описанию и адресу: {results: [{id, title, ..., rank, snippet}]}
+    """
+    authentication_classes = []
+    permission_classes = []
+    CACHE_CONTROL = "public, max-age=60"
+
+    def get(self, request):
+        q = (request.query_params.get('q') or '').strip()
+        if not q:
+            return Response({"detail": "q is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', 20))
+            offset = int(request.query_params.get('offset', 0))
+        except ValueError:
+            return Response({"detail": f"limit/offset must be integers (limit <= {MAX_LIMIT})"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response({"results": search_listings(q, limit, offset)})
+
+
+class MarketPricesView(CacheHeadersMixin, APIView):
+    """
+    GET /api/market/prices?rooms=2&currency=KZT&from=2026-01-01&to=2026-01-31
+    Медиана цены по количеству комнат и валюте за день — из предпосчитанного PriceRollup.
+    rollup_prices удаляет и заново вставляет строки, так что (count, max id)
+    меняется при каждом пересчёте — из них и ETag.
+    """
+    authentication_classes = []
+    permission_classes = []
+    CACHE_CONTROL = "public, max-age=3600"
+
+    def get(self, request):
+        qs = PriceRollup.objects.all()
+        try:
+            if request.query_params.get('rooms'):
+                qs = qs.filter(rooms=int(request.query_params['rooms']))
+            if request.query_params.get('currency'):
+                qs = qs.filter(currency=request.query_params['currency'])
+            if request.query_params.get('from'):
+                qs = qs.filter(day__gte=date.fromisoformat(request.query_params['from']))
+            if request.query_params.get('to'):
+                qs = qs.filter(day__lte=date.fromisoformat(request.query_params['to']))
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        version = qs.aggregate(n=Count('id'), last=Max('id'))
+        tag = content_etag([request.query_params.urlencode(), version['n'], version['last']])
+        resp = not_modified(request, tag)
+        if resp is None:
+            rows = qs.values('day', 'rooms', 'currency', 'listings', 'median_price')[:1000]
+            resp = Response({"results": list(rows)})
+            resp['ETag'] = tag
+        return resp
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Сжатие ответов: brotli — только для JSON API, если клиент его принимает
+и пакет установлен; всё остальное — стандартный GZipMiddleware. HTML
+(админка, формы с csrfmiddlewaretoken) brotli не сжимаем: GZipMiddleware
+защищён от BREACH случайным паддингом (max_random_bytes), а голый brotli
+нет. Уже сжатые форматы (фото из /api/img/) не трогаем — только тратить CPU.
+"""
+
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен, без него остаётся gzip
+    brotli = None
+
+BROTLI_QUALITY = 5  # на JSON почти как 11, но в разы быстрее
+MIN_LENGTH = 200    # как у GZipMiddleware: короче — заголовки дороже выигрыша
+
+_BR_RE = _lazy_re_compile(r"\bbr\b")
+_SKIP_TYPES = ("image/", "video/", "audio/", "application/zip", "application/gzip")
+_BROTLI_TYPES = ("application/json",)
+
+
+class CompressionMiddleware(GZipMiddleware):
+
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding"):
+            return response
+        content_type = response.get("Content-Type", "")
+        if content_type.startswith(_SKIP_TYPES):
+            return response
+        if (brotli is None or response.streaming
+                or not content_type.startswith(_BROTLI_TYPES)
+                or not _BR_RE.search(request.META.get("HTTP_ACCEPT_ENCODING", ""))):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if len(response.content) < MIN_LENGTH:
+            return response
+        compressed = brotli.compress(response.content, quality=BROTLI_QUALITY)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        # тело другое -> сильный ETag становится слабым (как делает GZipMiddleware)
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = "br"
+        return response
@@ -44,6 +44,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'roomify.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -124,3 +125,20 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Recrawl: сколько запросов к krisha.kz в час можно потратить на обновление
+RECRAWL_BUDGET_PER_HOUR = int(os.getenv('RECRAWL_BUDGET_PER_HOUR', '300'))
+
+# Прокси фотографий /api/img/<key>: миниатюры WebP в on-disk LRU
+IMAGE_PROXY_ENABLED = os.getenv('IMAGE_PROXY_ENABLED', '1') == '1'
+IMAGE_CACHE_DIR = Path(os.getenv('IMAGE_CACHE_DIR', BASE_DIR / 'var' / 'imgcache'))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv('IMAGE_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+IMAGE_PROXY_WORKERS = int(os.getenv('IMAGE_PROXY_WORKERS', '4'))
+
+# /api/krisha/<id>: сколько секунд клиент и сервер считают результат скрейпа свежим
+# (в этом окне повторный запрос с If-None-Match получает 304 без похода на krisha.kz)
+KRISHA_BY_ID_MAX_AGE = int(os.getenv('KRISHA_BY_ID_MAX_AGE', '300'))
+
+# 0 — воркер только для чтения: /api/krisha/<id> и /api/ingest не подключаются,
+# стек скрейпера (requests, bs4, lxml) в процесс не загружается
+SCRAPER_ENABLED = os.getenv('SCRAPER_ENABLED', '1') == '1'
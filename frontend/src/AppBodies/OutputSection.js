@@ -15,8 +15,9 @@ function OutputSection({ data, onBack }) {
         {data.images.map((img, index) => (
           <img 
             key={index} 
-            src={img} 
+            src={data.thumbs?.[index] || img} 
             alt={`Фото ${index + 1}`} 
+            loading="lazy"
             style={{ width: '200px', borderRadius: '8px', margin: '8px' }}
           />
         ))}